@@ -0,0 +1,46 @@
+# -----------------------------------------------------------------------------
+# bench_columns.py
+# -----------------------------------------------------------------------------
+
+'''
+Time evaluating S-FEEL text over columns of values with numpy (evaluateColumns())
+against evaluating it one row at a time (evaluateMany())
+
+usage: python benchmarks/bench_columns.py [rows]
+'''
+
+import sys
+import os
+import time
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pySFeel
+
+
+if __name__ == '__main__':
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = numpy.random.default_rng(42)
+    income = numpy.ma.MaskedArray(rng.uniform(0.0, 200000.0, rows), mask=rng.random(rows) < 0.01)
+    age = numpy.ma.MaskedArray(rng.integers(16, 90, rows).astype(float), mask=rng.random(rows) < 0.01)
+    sfeelText = '(age in [18..65]) and (floor(income / 1000) * 1.5 + sqrt(age) > 100)'
+
+    parser = pySFeel.SFeelParser()
+    compiled = parser.compile(sfeelText)
+    start = time.perf_counter()
+    (status, values) = compiled.evaluateColumns({'income': income, 'age': age})
+    columnsTime = time.perf_counter() - start
+    print(f'evaluateColumns(): {rows} rows in {columnsTime:.3f}s')
+
+    names = [{'income': None if numpy.ma.is_masked(income[i]) else float(income[i]),
+              'age': None if numpy.ma.is_masked(age[i]) else float(age[i])} for i in range(rows)]
+    start = time.perf_counter()
+    results = list(compiled.evaluateMany(names))
+    rowsTime = time.perf_counter() - start
+    print(f'evaluateMany(): {rows} rows in {rowsTime:.3f}s ({rowsTime / columnsTime:.0f}x slower)')
+
+    for i in range(rows):
+        (status, value) = results[i]
+        assert (value is None) if numpy.ma.is_masked(values[i]) else (value == values[i])
@@ -0,0 +1,41 @@
+# -----------------------------------------------------------------------------
+# bench_import.py
+# -----------------------------------------------------------------------------
+
+'''
+Time importing pySFeel (which loads the saved LALR tables)
+against building the LALR tables from the grammar
+
+usage: python benchmarks/bench_import.py [-b]
+  -b also time building the LALR tables (this takes a while)
+'''
+
+import sys
+import os
+import subprocess
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sly.yacc import LRTable
+import pySFeel
+from pySFeel import SFeel
+
+
+if __name__ == '__main__':
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import pySFeel; pySFeel.SFeelParser()'], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    print(f'import pySFeel (new interpreter): {time.perf_counter() - start:.3f}s')
+
+    grammar = pySFeel.SFeelParser._grammar
+    start = time.perf_counter()
+    signature = SFeel._parseTablesSignature(grammar)
+    lrtable = SFeel._loadParseTables(grammar, signature)
+    print(f'load the saved LALR tables: {time.perf_counter() - start:.3f}s ({"found" if lrtable is not None else "not found"})')
+
+    if '-b' in sys.argv[1:]:
+        start = time.perf_counter()
+        LRTable(grammar)
+        print(f'build the LALR tables: {time.perf_counter() - start:.3f}s')
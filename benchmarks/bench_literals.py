@@ -0,0 +1,43 @@
+# -----------------------------------------------------------------------------
+# bench_literals.py
+# -----------------------------------------------------------------------------
+
+'''
+Time parsing list and context literals of increasing size.
+If building them is linear then doubling the number of items should (roughly) double the time
+
+usage: python benchmarks/bench_literals.py [maxItems]
+'''
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pySFeel
+
+
+if __name__ == '__main__':
+
+    maxItems = int(sys.argv[1]) if len(sys.argv) > 1 else 64000
+    parser = pySFeel.SFeelParser()
+    print(f'{"items":>8} {"list":>10} {"ratio":>6} {"context":>10} {"ratio":>6}')
+    items = 4000
+    lastList = lastContext = None
+    while items <= maxItems:
+        listText = '[' + ', '.join(str(i) for i in range(items)) + ']'
+        contextText = '{' + ', '.join(f'code{i}: {i}' for i in range(items)) + '}'
+        start = time.perf_counter()
+        (status, retVal) = parser.sFeelParse(listText)
+        listTime = time.perf_counter() - start
+        assert ('errors' not in status) and (len(retVal) == items)
+        start = time.perf_counter()
+        (status, retVal) = parser.sFeelParse(contextText)
+        contextTime = time.perf_counter() - start
+        assert ('errors' not in status) and (len(retVal) == items)
+        listRatio = f'{listTime / lastList:.1f}' if lastList else ''
+        contextRatio = f'{contextTime / lastContext:.1f}' if lastContext else ''
+        print(f'{items:>8} {listTime:>9.3f}s {listRatio:>6} {contextTime:>9.3f}s {contextRatio:>6}')
+        (lastList, lastContext) = (listTime, contextTime)
+        items *= 2
@@ -3,16 +3,34 @@
 # -----------------------------------------------------------------------------
 
 from sly import Lexer, Parser
+import sly
+from sly.yacc import YaccProduction, LRTable
 import re
 import datetime
 import dateutil.parser
+import dateutil.tz
 import pytz
 import copy
 import math
 import statistics
 from operator import itemgetter
+import operator
+from collections import OrderedDict, deque
+import itertools
+import concurrent.futures
 import ast
 import warnings
+import hashlib
+import json
+import os
+import threading
+import functools
+import bisect
+import heapq
+try:
+    import numpy        # Optional - only needed by evaluateColumns()
+except ImportError:
+    numpy = None
 
 class SFeelLexer(Lexer):
     tokens = {BOOLEAN, DATEFUNC, TIMEFUNC, DATEANDTIMEFUNC,
@@ -264,11 +282,1312 @@ class SFeelLexer(Lexer):
         self.index += 1
         return t
 
+
+# The saved LALR tables for SFeelParser (building them takes far longer than loading them)
+PARSETAB = 'SFeel_parsetab.json'
+
+
+def _parseTablesSignature(grammar):
+    '''
+    Return a signature for the grammar, so that saved LALR tables are only ever used with the grammar they were built from
+    '''
+    signature = hashlib.sha256()
+    signature.update(f'sly {sly.__version__}\n'.encode('utf-8'))
+    signature.update(f'start {grammar.Start}\n'.encode('utf-8'))
+    for term in sorted(grammar.Precedence):
+        signature.update(f'precedence {term} {grammar.Precedence[term]}\n'.encode('utf-8'))
+    for production in grammar.Productions:
+        signature.update(f'{production.name} -> {" ".join(production.prod)} {production.prec}\n'.encode('utf-8'))
+    return signature.hexdigest()
+
+
+def _parseTablesFiles():
+    '''
+    Return the files that can hold the saved LALR tables - the one shipped with the package, then the user's cache
+    '''
+    cacheDir = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return [os.path.join(os.path.dirname(os.path.abspath(__file__)), PARSETAB),
+            os.path.join(cacheDir, 'pySFeel', PARSETAB)]
+
+
+def _loadParseTables(grammar, signature):
+    '''
+    Load the saved LALR tables for this grammar, returning None if there aren't any
+    '''
+    for parseTabFile in _parseTablesFiles():
+        try:
+            with open(parseTabFile, 'rt', encoding='utf-8') as fpIn:
+                tables = json.load(fpIn)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(tables, dict) or (tables.get('signature') != signature):
+            continue
+        try:
+            lrtable = LRTable.__new__(LRTable)
+            lrtable.grammar = grammar
+            lrtable.lr_productions = grammar.Productions
+            lrtable.lr_action = {int(state):actions for (state, actions) in tables['action'].items()}
+            lrtable.lr_goto = {int(state):gotos for (state, gotos) in tables['goto'].items()}
+            lrtable.defaulted_states = {int(state):action for (state, action) in tables['defaulted'].items()}
+            lrtable.sr_conflicts = []
+            lrtable.rr_conflicts = []
+        except (KeyError, AttributeError, TypeError, ValueError):
+            continue
+        return lrtable
+    return None
+
+
+def _saveParseTables(lrtable, signature):
+    '''
+    Save the LALR tables next to this module (like PLY's parsetab.py) or, if that isn't writeable, in the user's cache
+    '''
+    lines = ['{"signature":' + json.dumps(signature) + ',']
+    for (table, states) in (('action', lrtable.lr_action), ('goto', lrtable.lr_goto), ('defaulted', lrtable.defaulted_states)):
+        entries = [json.dumps(str(state)) + ':' + json.dumps(states[state], separators=(',', ':')) for state in sorted(states)]
+        lines.append(json.dumps(table) + ':{' + ',\n'.join(entries) + '}' + (',' if table != 'defaulted' else '}'))
+    for parseTabFile in _parseTablesFiles():
+        try:
+            os.makedirs(os.path.dirname(parseTabFile), exist_ok=True)
+            tmpFile = f'{parseTabFile}.{os.getpid()}.tmp'
+            with open(tmpFile, 'wt', encoding='utf-8', newline='\n') as fpOut:
+                fpOut.write('\n'.join(lines) + '\n')
+            os.replace(tmpFile, parseTabFile)
+        except OSError:
+            continue
+        return True
+    return False
+
+
+# Strict ISO 8601 dates, times and date and times, which are converted without dateutil.
+# Zero UTC offsets (Z, +00:00) are left to dateutil, as dateutil returns local time for them if local time is UTC
+ISO_DATE = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})')
+ISO_TIME = re.compile(r'([0-9]{2}):([0-9]{2}):([0-9]{2})(\.[0-9]{1,6})?(([+-])([0-9]{2}):([0-9]{2}))?')
+ISO_DATETIME = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})(T([0-9]{2}):([0-9]{2}):([0-9]{2})(\.[0-9]{1,6})?(([+-])([0-9]{2}):([0-9]{2}))?)?')
+ISO_CACHE_SIZE = 4096           # The number of converted ISO 8601 strings that are cached
+
+
+def _isoTimeZone(sign, hours, minutes):
+    ''' The dateutil tzinfo for a non-zero UTC offset, or None '''
+    if hours is None:
+        return None
+    offset = int(hours) * 3600 + int(minutes) * 60
+    if offset == 0:
+        raise ValueError('zero UTC offset')
+    if sign == '-':
+        offset = -offset
+    return dateutil.tz.tzoffset(None, offset)
+
+
+@functools.lru_cache(maxsize=ISO_CACHE_SIZE)
+def _isoDate(text):
+    ''' Convert a strict ISO 8601 date string to datetime.date, returning None if it isn't one '''
+    match = ISO_DATE.fullmatch(text)
+    if match is None:
+        return None
+    try:
+        return datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=ISO_CACHE_SIZE)
+def _isoTime(text):
+    ''' Convert a strict ISO 8601 time string to datetime.time, returning None if it isn't one '''
+    match = ISO_TIME.fullmatch(text)
+    if match is None:
+        return None
+    microsecond = 0 if match.group(4) is None else int(match.group(4)[1:].ljust(6, '0'))
+    try:
+        return datetime.time(int(match.group(1)), int(match.group(2)), int(match.group(3)), microsecond,
+                             tzinfo=_isoTimeZone(match.group(6), match.group(7), match.group(8)))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=ISO_CACHE_SIZE)
+def _isoDateTime(text):
+    ''' Convert a strict ISO 8601 date and time (or date) string to datetime.datetime, returning None if it isn't one '''
+    match = ISO_DATETIME.fullmatch(text)
+    if match is None:
+        return None
+    if match.group(4) is None:
+        (hour, minute, second, microsecond) = (0, 0, 0, 0)
+    else:
+        (hour, minute, second) = (int(match.group(5)), int(match.group(6)), int(match.group(7)))
+        microsecond = 0 if match.group(8) is None else int(match.group(8)[1:].ljust(6, '0'))
+    try:
+        return datetime.datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)), hour, minute, second, microsecond,
+                                 tzinfo=_isoTimeZone(match.group(10), match.group(11), match.group(12)))
+    except ValueError:
+        return None
+
+
+def _parseDate(text):
+    ''' Convert a string to datetime.date, using dateutil if it isn't a strict ISO 8601 date. None if it can't be converted '''
+    thisDate = _isoDate(text)
+    if thisDate is not None:
+        return thisDate
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return dateutil.parser.parse(text).date()
+    except:
+        return None
+
+
+def _parseTime(text):
+    ''' Convert a string to datetime.time (with timezone), using dateutil if it isn't a strict ISO 8601 time. None if it can't be converted '''
+    thisTime = _isoTime(text)
+    if thisTime is not None:
+        return thisTime
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return dateutil.parser.parse(text).timetz()
+    except:
+        return None
+
+
+def _parseDateTime(text):
+    ''' Convert a string to datetime.datetime, using dateutil if it isn't a strict ISO 8601 date and time. None if it can't be converted '''
+    thisDateTime = _isoDateTime(text)
+    if thisDateTime is not None:
+        return thisDateTime
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return dateutil.parser.parse(text)
+    except:
+        return None
+
+
+REGEX_CACHE_SIZE = 1024         # The number of compiled matches(), replace() and split() patterns that are cached
+
+
+@functools.lru_cache(maxsize=REGEX_CACHE_SIZE)
+def _compileRegex(pattern, flags, replacement=None):
+    '''
+    Compile a FEEL regular expression, returning the compiled regular expression and the Python replacement template.
+    For replace() (replacement is not None) the whole pattern is a group and $n in the replacement refers to group n+1
+    '''
+    if replacement is None:
+        return (re.compile(pattern, flags), None)
+    template = re.sub(pattern=r'\$(\d+)', repl=lambda x: '\\' + str(int(x.group(1)) + 1), string=replacement)    # Convert SFEEL regular expressions to Python
+    return (re.compile(r'(' + pattern + r')', flags), template)
+
+
+def _regexFlags(flags):
+    ''' Convert FEEL regular expression flags to Python re flags, returning None if they are not a string '''
+    if flags is None:
+        return 0
+    if not isinstance(flags, str):
+        return None
+    reFlags = 0
+    if 's' in flags:
+        reFlags |= re.S
+    if 'm' in flags:
+        reFlags |= re.M
+    if 'i' in flags:
+        reFlags |= re.I
+    if 'x' in flags:
+        reFlags |= re.X
+    return reFlags
+
+
+LIST_INDEX_SIZE = 64            # The number of list indexes (for list contains() and index of()) that are kept
+LIST_INDEX_MIN = 64             # Shorter lists are searched, rather than indexed
+
+
+NO_VALUE = object()     # Returned by lookups and name properties when there is no value
+
+
+def _dateProperty(attribute):
+    ''' A name property of a date or date and time '''
+    def getProperty(value):
+        if isinstance(value, datetime.date):
+            return float(getattr(value, attribute))
+        return NO_VALUE
+    return getProperty
+
+
+def _weekdayProperty(value):
+    ''' The ISO weekday of a date or date and time '''
+    if isinstance(value, datetime.date):
+        return float(value.isoweekday())
+    return NO_VALUE
+
+
+def _timeProperty(attribute):
+    ''' A name property of a time or date and time '''
+    def getProperty(value):
+        if isinstance(value, (datetime.datetime, datetime.time)):
+            return float(getattr(value, attribute))
+        return NO_VALUE
+    return getProperty
+
+
+def _timezoneProperty(value):
+    ''' The timezone of a time or date and time '''
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        if value.tzinfo is None:
+            return None
+        try:
+            return str(value.tzinfo.zone)
+        except:
+            return str(value.tzname())
+    return NO_VALUE
+
+
+def _timeOffsetProperty(value):
+    ''' The UTC offset of a time or date and time '''
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo == None:
+            return None
+        return value.utcoffset()
+    elif isinstance(value, datetime.time):
+        if value.tzinfo == None:
+            return None
+        return datetime.datetime.combine(datetime.date.today(), value).utcoffset()
+    return NO_VALUE
+
+
+def _durationProperty(convert):
+    ''' A name property of a days and time duration '''
+    def getProperty(value):
+        if isinstance(value, datetime.timedelta):
+            return convert(value.total_seconds())
+        return NO_VALUE
+    return getProperty
+
+
+def _monthsProperty(convert):
+    ''' A name property of a years and months duration (an int number of months) '''
+    def getProperty(value):
+        if type(value) == int:
+            return convert(value)
+        return NO_VALUE
+    return getProperty
+
+
+def _rangeProperty(index):
+    ''' The start or end of a range '''
+    def getProperty(value):
+        if isinstance(value, tuple) and (len(value) == 4):
+            if value[index] is None:
+                return None
+            try:
+                return float(value[index])
+            except:
+                return None
+        return NO_VALUE
+    return getProperty
+
+
+def _includedProperty(index, bracket):
+    ''' Whether the start or end of a range is included '''
+    def getProperty(value):
+        if isinstance(value, tuple) and (len(value) == 4):
+            return value[index] == bracket
+        return NO_VALUE
+    return getProperty
+
+
+# The properties of named values (name.year, name.start etc), by suffix.
+# Each entry is the property function and where the named value is looked up
+#   'names' - in names if it is there, else in the context
+#   'both' - in names, then (if that value doesn't have the property) in the context
+#   'context' - in the context if it is there, else in names
+NAME_PROPERTIES = {
+    'year': (_dateProperty('year'), 'names'),
+    'month': (_dateProperty('month'), 'both'),
+    'day': (_dateProperty('day'), 'both'),
+    'weekday': (_weekdayProperty, 'both'),
+    'hour': (_timeProperty('hour'), 'both'),
+    'minute': (_timeProperty('minute'), 'both'),
+    'second': (_timeProperty('second'), 'both'),
+    'timezone': (_timezoneProperty, 'context'),
+    'time_offset': (_timeOffsetProperty, 'context'),
+    'days': (_durationProperty(lambda seconds: float(seconds / 60 / 60 / 24)), 'both'),
+    'hours': (_durationProperty(lambda seconds: float(seconds / 60 / 60) % 24), 'both'),
+    'minutes': (_durationProperty(lambda seconds: float(seconds / 60) % 60), 'both'),
+    'seconds': (_durationProperty(lambda seconds: float(seconds % 60)), 'both'),
+    'years': (_monthsProperty(lambda months: float(months / 12)), 'both'),
+    'months': (_monthsProperty(lambda months: float(months % 12)), 'both'),
+    'start': (_rangeProperty(1), 'context'),
+    'start_included': (_includedProperty(0, '['), 'context'),
+    'end': (_rangeProperty(2), 'context'),
+    'end_included': (_includedProperty(3, ']'), 'context'),
+}
+
+_LIST_KEY = object()            # Marks the hash key of a list
+_CONTEXT_KEY = object()         # Marks the hash key of a context
+
+
+def _hashKey(value):
+    '''
+    A hashable key for a FEEL value, where the keys of two values are equal if, and only if, the values are equal.
+    Lists, contexts and ranges are converted to (marked) tuples. Raises TypeError if the value can't be hashed
+    '''
+    if isinstance(value, list):
+        return (_LIST_KEY,) + tuple(_hashKey(item) for item in value)
+    if isinstance(value, dict):
+        return (_CONTEXT_KEY, frozenset((key, _hashKey(value[key])) for key in value))
+    if isinstance(value, tuple):
+        return tuple(_hashKey(item) for item in value)
+    hash(value)
+    return value
+
+
+def _distinctValues(values):
+    ''' The distinct values, in the order they first occur - hashed if possible, otherwise compared with every distinct value so far '''
+    distinct = []
+    try:
+        seen = set()
+        for value in values:
+            key = _hashKey(value)
+            if key not in seen:
+                seen.add(key)
+                distinct.append(value)
+        return distinct
+    except TypeError:
+        distinct = []
+        for value in values:
+            if value not in distinct:
+                distinct.append(value)
+        return distinct
+
+# The type of a range's endpoints (and of the values that can be in the range), by the type of the value
+RANGE_KINDS = {str: str, int: int, float: float, datetime.date: datetime.date, datetime.datetime: datetime.date,
+               datetime.time: datetime.time, datetime.timedelta: datetime.timedelta}
+
+
+def _rangeKind(value):
+    ''' The range kind of a value (year and month durations are int), or None if it can't be in a range '''
+    kind = RANGE_KINDS.get(type(value))
+    if kind is not None:
+        return kind
+    for thisType in (str, float, datetime.date, datetime.time, datetime.timedelta):
+        if isinstance(value, thisType):
+            return thisType
+    return None
+
+
+class Range(tuple):
+    '''
+    A FEEL range - the tuple (end0, low, high, end1) where end0 is '[' if low is in the range and end1 is ']' if high is in the range.
+    low is None for '< high' and '<= high' and high is None for '> low' and '>= low'
+    A Range is no larger than the tuple - the endpoint tests are looked up in class tables, by bracket
+    '''
+    __slots__ = ()
+
+    LOW_TESTS = {'[': operator.le, '(': operator.lt, ']': operator.lt}     # The test of low against a value, by end0
+    HIGH_TESTS = {']': operator.ge, ')': operator.gt, '[': operator.gt}    # The test of high against a value, by end1
+
+    def __new__(cls, end0, low, high, end1):
+        return tuple.__new__(cls, (end0, low, high, end1))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    @property
+    def kind(self):
+        ''' The range kind of the values that can be in the range (see _rangeKind()) - None if no value can be '''
+        (end0, low, high, end1) = self
+        if low is None:
+            return None if high is None else _rangeKind(high)
+        kind = _rangeKind(low)
+        if (high is not None) and (_rangeKind(high) is not kind):
+            return None
+        return kind
+
+    @property
+    def lowTest(self):
+        ''' The test of low against a value - None if there is no low endpoint '''
+        return None if self[1] is None else self.LOW_TESTS.get(self[0], operator.lt)
+
+    @property
+    def highTest(self):
+        ''' The test of high against a value - None if there is no high endpoint '''
+        return None if self[2] is None else self.HIGH_TESTS.get(self[3], operator.gt)
+
+    @classmethod
+    def fromValue(cls, value):
+        ''' Return value as a Range, or None if value isn't a range (a 4-tuple) '''
+        if isinstance(value, Range):
+            return value
+        if isinstance(value, tuple) and (len(value) == 4):
+            return cls(*value)
+        return None
+
+    def contains(self, value):
+        ''' True if value is in this range, False if it isn't or it isn't the same type as the endpoints '''
+        (end0, low, high, end1) = self
+        kind = _rangeKind(value)
+        if kind is None:
+            return False
+        try:
+            if low is not None:
+                if (_rangeKind(low) is not kind) or not self.LOW_TESTS.get(end0, operator.lt)(low, value):
+                    return False
+                if high is None:
+                    return True
+            elif high is None:
+                return False
+            return (_rangeKind(high) is kind) and self.HIGH_TESTS.get(end1, operator.gt)(high, value)
+        except TypeError:           # dates and date and times
+            return False
+
+
+def _indexKind(value):
+    ''' The kind of a value in a RangeIndex - the range kind, but dates and date and times (which can't be compared) are kept apart '''
+    kind = _rangeKind(value)
+    if kind is datetime.date:
+        return (kind, isinstance(value, datetime.datetime))
+    return kind
+
+
+class _IntervalNode:
+    ''' A node of a centered interval tree - the ranges that include center and the subtrees of the ranges below and above it '''
+    __slots__ = ('center', 'byLow', 'byHigh', 'left', 'right')
+
+    def __init__(self, ranges):
+        endpoints = sorted([thisRange[1] for thisRange in ranges] + [thisRange[2] for thisRange in ranges])
+        self.center = endpoints[len(endpoints) // 2]
+        here = []
+        left = []
+        right = []
+        for thisRange in ranges:
+            if thisRange[2] < self.center:
+                left.append(thisRange)
+            elif thisRange[1] > self.center:
+                right.append(thisRange)
+            else:
+                here.append(thisRange)
+        self.byLow = sorted(here, key=itemgetter(1))
+        self.byHigh = sorted(here, key=itemgetter(2), reverse=True)
+        self.left = _IntervalNode(left) if left else None
+        self.right = _IntervalNode(right) if right else None
+
+
+class _RangeBucket:
+    ''' The ranges of one kind in a RangeIndex - '< x' and '<= x' by x, '> x' and '>= x' by x and the other ranges in an interval tree '''
+    __slots__ = ('below', 'belowHighs', 'above', 'aboveLows', 'tree')
+
+    def __init__(self, ranges):
+        self.below = sorted([thisRange for thisRange in ranges if thisRange[1] is None], key=itemgetter(2))
+        self.belowHighs = [thisRange[2] for thisRange in self.below]
+        self.above = sorted([thisRange for thisRange in ranges if thisRange[2] is None], key=itemgetter(1))
+        self.aboveLows = [thisRange[1] for thisRange in self.above]
+        bounded = [thisRange for thisRange in ranges if (thisRange[1] is not None) and (thisRange[2] is not None)]
+        self.tree = _IntervalNode(bounded) if bounded else None
+
+    def matches(self, value):
+        ''' The positions of the ranges that value is in '''
+        found = []
+        for thisRange in self.below[bisect.bisect_left(self.belowHighs, value):]:
+            if (thisRange[2] > value) or (thisRange[3] == ']'):
+                found.append(thisRange[4])
+        for thisRange in self.above[:bisect.bisect_right(self.aboveLows, value)]:
+            if (thisRange[1] < value) or (thisRange[0] == '['):
+                found.append(thisRange[4])
+        node = self.tree
+        while node is not None:
+            if value < node.center:
+                for thisRange in node.byLow:
+                    if thisRange[1] > value:
+                        break
+                    if (thisRange[1] < value) or (thisRange[0] == '['):
+                        found.append(thisRange[4])
+                node = node.left
+            elif value > node.center:
+                for thisRange in node.byHigh:
+                    if thisRange[2] < value:
+                        break
+                    if (thisRange[2] > value) or (thisRange[3] == ']'):
+                        found.append(thisRange[4])
+                node = node.right
+            else:
+                for thisRange in node.byLow:
+                    if ((thisRange[1] < value) or (thisRange[0] == '[')) and ((thisRange[2] > value) or (thisRange[3] == ']')):
+                        found.append(thisRange[4])
+                break
+        return found
+
+
+class RangeIndex:
+    '''
+    An index of many ranges (e.g. the '[0..17]', '[18..64]' and '>= 65' tests of one input of a decision table),
+    which finds the ranges that a value is in without testing every range
+    '''
+
+    def __init__(self, ranges):
+        """
+        Build the index
+
+        Ranges are Ranges (or (end0, low, high, end1) tuples), as returned by sFeelParse('[0..17]') or sFeelParse('(>= 65)').
+        Other values that can be in a range (strings, numbers, dates, times and durations) are treated as the range [value..value].
+        Anything else is never matched.
+
+        Args:
+            param1 (list): The ranges
+
+        Returns:
+            RangeIndex: the index
+        """
+
+        self.ranges = list(ranges)
+        self.others = []            # Ranges that can't be put in a bucket (mixed endpoint types), tested one by one
+        kinds = {}
+        for position, thisRange in enumerate(self.ranges):
+            if (not isinstance(thisRange, tuple)) and (_rangeKind(thisRange) is not None):
+                thisRange = ('[', thisRange, thisRange, ']')
+            thisRange = Range.fromValue(thisRange)
+            if thisRange is None:
+                continue
+            (end0, low, high, end1) = thisRange
+            if (low is None) and (high is None):
+                continue
+            lowKind = _indexKind(high if low is None else low)
+            highKind = _indexKind(low if high is None else high)
+            if (lowKind is None) or (lowKind != highKind):
+                self.others.append((thisRange, position))
+                continue
+            if (low is not None) and (high is not None):
+                try:
+                    if (low > high) or ((low == high) and ((end0 != '[') or (end1 != ']'))):
+                        continue        # An empty range (e.g. [10..1] or (5..5]) - no value is in it
+                except TypeError:       # e.g. date and times with and without timezones
+                    self.others.append((thisRange, position))
+                    continue
+            kinds.setdefault(lowKind, []).append((end0, low, high, end1, position))
+        self.buckets = {}
+        for kind, ranges in kinds.items():
+            try:
+                self.buckets[kind] = _RangeBucket(ranges)
+            except TypeError:       # e.g. date and times with and without timezones
+                self.others += [(Range(*thisRange[:4]), thisRange[4]) for thisRange in ranges]
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def matches(self, value):
+        """
+        Find the ranges that a value is in
+
+        Args:
+            param1 (any): The value
+
+        Returns:
+            list: the positions (from 0) of the ranges that the value is in, in order
+        """
+
+        if isinstance(value, list) and (len(value) == 1):
+            value = value[0]
+        found = []
+        bucket = self.buckets.get(_indexKind(value))
+        if bucket is not None:
+            try:
+                found = bucket.matches(value)
+            except TypeError:       # e.g. a date and time with a timezone against date and times without
+                found = []
+        for (thisRange, position) in self.others:
+            if thisRange.contains(value):
+                found.append(position)
+        found.sort()
+        return found
+
+
+class ScopeChain:
+    '''
+    A chain of scopes (context literals being built, the items of some/every) which are pushed and popped as they are entered and left.
+    Each name maps to a stack of its values, innermost last, so that looking up a name doesn't scan the scopes.
+    Scopes of some/every items are bound scopes - their names are looked up before the names (variables)
+    '''
+    __slots__ = ('frames', 'values', 'bound')
+
+    def __init__(self):
+        self.frames = []            # The names (dict) of each scope, innermost last
+        self.values = {}            # The values of each name, innermost last
+        self.bound = {}             # For each value of each name, True if it was defined in a bound scope
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def push(self, frame=None, bound=False):
+        ''' Enter a new scope, optionally with some names already defined (and bound, for the items of some/every) '''
+        self.frames.append({})
+        if frame is not None:
+            for name in frame:
+                self.set(name, frame[name], bound)
+
+    def pop(self):
+        ''' Leave the innermost scope, returning its names '''
+        frame = self.frames.pop()
+        for name in frame:
+            values = self.values[name]
+            values.pop()
+            self.bound[name].pop()
+            if not values:
+                del self.values[name]
+                del self.bound[name]
+        return frame
+
+    def set(self, name, value, bound=False):
+        ''' Define (or redefine) a name in the innermost scope '''
+        frame = self.frames[-1]
+        if name in frame:
+            self.values[name][-1] = value
+        else:
+            self.values.setdefault(name, []).append(value)
+            self.bound.setdefault(name, []).append(bound)
+        frame[name] = value
+
+    def get(self, name, default=None):
+        ''' The innermost value of name, or default if it isn't defined in any scope '''
+        values = self.values.get(name)
+        if values is None:
+            return default
+        return values[-1]
+
+    def getBound(self, name, default=None):
+        ''' The innermost value of name if it was defined in a bound scope (an item of some/every), otherwise default '''
+        bound = self.bound.get(name)
+        if (bound is None) or not bound[-1]:
+            return default
+        return self.values[name][-1]
+
+    def inFrame(self, name):
+        ''' True if name is defined in the innermost scope '''
+        return name in self.frames[-1]
+
+PARALLEL_CHUNK_SIZE = 1000      # The number of rows that evaluateParallel() sends to a worker process at a time
+
+_workerExpressions = None       # The CompiledExpressions of a worker process (see evaluateParallel())
+
+
+def _startWorker(expressions):
+    ''' Initialize a worker process - the expressions were recompiled as they were unpickled '''
+    global _workerExpressions
+    _workerExpressions = expressions
+
+
+def _evaluateRow(expressions, names):
+    ''' Evaluate each CompiledExpression against one row of names, reporting an exception as an error of that row '''
+    results = []
+    for expression in expressions:
+        try:
+            results.append(expression.evaluate(names))
+        except Exception as e:
+            results.append(({'errors': [f'Evaluation failed: {e!r}']}, None))
+    return results
+
+
+def _evaluateChunk(rows):
+    ''' Evaluate the worker's CompiledExpressions against a chunk of rows '''
+    return [_evaluateRow(_workerExpressions, names) for names in rows]
+
+
+def _evaluateParallel(expressions, rows, workers, chunkSize):
+    '''
+    Evaluate CompiledExpressions against rows of names in worker processes, yielding the list of (status, value) of each row in the order of the rows.
+    The expressions are sent to each worker once and the rows in chunks, with at most two chunks per worker waiting, so memory is bounded
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunkSize is None:
+        chunkSize = PARALLEL_CHUNK_SIZE
+    rows = iter(rows)
+    if workers <= 1:
+        for names in rows:
+            yield _evaluateRow(expressions, names)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_startWorker, initargs=(expressions,)) as executor:
+        pending = deque()
+        try:
+            while True:
+                chunk = list(itertools.islice(rows, chunkSize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_evaluateChunk, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+# The arithmetic, comparison and membership of the grammar rules, which compiled expressions also call directly
+
+
+def _add(expr0, expr1):
+    '''
+    Add two expressions
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if isinstance(expr0, list) and (len(expr0) == 1):
+        var0 = expr0[0]
+    else:
+        var0 = expr0
+    if isinstance(expr1, list) and (len(expr1) == 1):
+        var1 = expr1[0]
+    else:
+        var1 = expr1
+    if isinstance(var0, list) and isinstance(var1, list):       # Concatentation of two lists
+        return var0 + var1
+    if isinstance(var0, list):                                  # Append to a list
+        return var0 + list(var1)
+    if isinstance(var1, list):                                  # Prepend to a list
+        return list(var0) + var1
+    if (type(var0) == int) and (type(var1) == int):         #  Addition of two durations(yearMonth)
+        return var0 + var1
+    if isinstance(var0, float) and isinstance(var1, float):
+        return var0 + var1
+    if isinstance(var0, str) and isinstance(var1, str):         # Concatenation of strings
+        return var0 + var1
+    if isinstance(var0, datetime.date):                     # True for both dates and datetimes
+        if isinstance(var1, datetime.timedelta):            # date/datetime plus days and time duration
+            return var0 + var1
+        elif type(var1) == int:                       # date/datetime plus year and month duration
+            year = (var0).year
+            month = (var0).month + var1
+            while month < 1:                                # Allow for addition of a negative duration
+                year -= 1
+                month += 12
+            while month > 12:                               # Bring month into range 1-12
+                year += 1
+                month -= 12
+            try:
+                newDate = (var0).replace(year=int(year), month=int(month))
+            except:
+                newDate = (var0).replace(year=int(year), month=int(month), day=28)
+            return newDate
+        else:
+            return None
+    if isinstance(var1, datetime.date):                 # True for both dates and datetimes
+        if isinstance(var0, datetime.timedelta):         # day and time duration plus date/datetime
+            return var0 + var1
+        elif type(var0) == int:                    # year and month duration plus date/datetime
+            year = (var1).year
+            month = (var1).month + var0
+            while month < 1:                            # Allow for the addtion of a negative duration
+                year -= 1
+                month += 12
+            while month > 12:                           # Bring month into range 1-12
+                year += 1
+                month -= 12
+            try:
+                newDate = (var1).replace(year=int(year), month=int(month))
+            except:
+                newDate = (var1).replace(year=int(year), month=int(month), day=28)
+            return newDate
+        else:
+            return None
+    if isinstance(var0, datetime.time) and isinstance(var1, datetime.timedelta):        # date or datetime plus days and time duration
+        return (datetime.datetime.combine(datetime.date.today(), var0) + var1).timetz()
+    if isinstance(var1, datetime.time) and isinstance(var0, datetime.timedelta):        # days and time duration plus date or datetime
+        return (datetime.datetime.combine(datetime.date.today(), var1) + var0).timetz()
+    if isinstance(var0, datetime.timedelta) and isinstance(var1, datetime.timedelta):   # days and time duration plus days and time duration
+        return var0 + var1
+    return None
+
+
+def _subtract(expr0, expr1):
+    '''
+    Subtract two expressions
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if isinstance(expr0, list) and (len(expr0) == 1):
+        var0 = expr0[0]
+    else:
+        var0 = expr0
+    if isinstance(expr1, list) and (len(expr1) == 1):
+        var1 = expr1[0]
+    else:
+        var1 = expr1
+    if (type(var0) == int) and (type(var1) == int):         # Subtraction of two durations(yearMonth)
+        return var0 - var1
+    if isinstance(var0, float) and isinstance(var1, float):
+        return var0 - var1
+    if isinstance(var0, datetime.date):                         # True for both dates and datetimes
+        if isinstance(var1, datetime.date):             # date or datetime minus date or datetime
+            try:
+                return var0 - var1
+            except:
+                return None
+        if isinstance(var1, datetime.timedelta):         # date/datetime minus days and time duration
+            return var0 - var1
+        if type(var1) == int:                       # date/datetime minus years and months duration
+            year = (var0).year
+            month = (var0).month - expr1
+            while month > 12:
+                year += 1
+                month -= 12
+            while month < 1:
+                year -= 1
+                month += 12
+            try:
+                newDate = (var0).replace(year=int(year), month=int(month))
+            except:
+                newDate = (var0).replace(year=int(year), month=int(month), day=28)
+            return newDate
+        else:
+            return None
+    elif isinstance(var0, datetime.time):            # time minus time or days and time duration
+        if isinstance(var1, datetime.time):               # time minus time
+            return datetime.datetime.combine(datetime.date.today(), var0) - datetime.datetime.combine(datetime.date.today(), var1)
+        elif isinstance(var1, datetime.timedelta):        # time minus days and time duration
+            return (datetime.datetime.combine(datetime.date.today(), var0) - var1).timetz()
+        else:
+            return None
+    elif isinstance(var0, datetime.timedelta) and isinstance(var1, datetime.timedelta):       # days and time duration minus days and time duration
+        return var0 - var1
+    else:
+        return None
+
+
+def _power(expr0, expr1):
+    '''
+    expression power expression
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if isinstance(expr0, list) and (len(expr0) == 1):
+        var0 = expr0[0]
+    else:
+        var0 = expr0
+    if isinstance(expr1, list) and (len(expr1) == 1):
+        var1 = expr1[0]
+    else:
+        var1 = expr1
+    if isinstance(var0, float) and isinstance(var1, float):
+        return var0 ** var1
+    else:
+        return None
+
+
+def _multiply(expr0, expr1):
+    '''
+    multiply two expressions
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if isinstance(expr0, list) and (len(expr0) == 1):
+        var0 = expr0[0]
+    else:
+        var0 = expr0
+    if isinstance(expr1, list) and (len(expr1) == 1):
+        var1 = expr1[0]
+    else:
+        var1 = expr1
+    if (type(var0) == int) and isinstance(var1, float):               # Year, month duration * number
+        return int(var0 * var1)
+    if isinstance(var0, float) and (type(var1) == int):               # number * Year, month duration
+        return int(var0 * var1)
+    if isinstance(var0, float) and isinstance(var1, float):
+        return var0 * var1
+    if isinstance(var0, datetime.timedelta) and isinstance(var1, float):
+        return var0 * var1
+    if isinstance(var1, datetime.timedelta) and isinstance(var0, float):
+        return var0 * var1
+    return None
+
+
+def _divide(expr0, expr1):
+    '''
+    divide two expressions
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if isinstance(expr0, list) and (len(expr0) == 1):
+        var0 = expr0[0]
+    else:
+        var0 = expr0
+    if isinstance(expr1, list) and (len(expr1) == 1):
+        var1 = expr1[0]
+    else:
+        var1 = expr1
+    if isinstance(expr1, list) and (len(expr1) == 1):
+        var1 = expr1[0]
+    else:
+        var1 = expr1
+    if var1 == 0:
+        return None
+    if (type(var0) == int) and isinstance(var1, float):               # Year, month duration / number
+        try:
+            return int(var0 / var1)
+        except:
+             return None
+    if (type(var0) == int) and (type(var1) == int):               # Year, month duration / Year, month duration
+        try:
+            return int(var0 / var1)
+        except:
+             return None
+    if isinstance(var0, float) and isinstance(var1, float):
+        try:
+            return var0 / var1
+        except:
+             return None
+    if isinstance(var0, datetime.timedelta) and isinstance(var1, float):
+        try:
+            return var0 / var1
+        except:
+            return None
+    if isinstance(var0, datetime.timedelta) and isinstance(var1, datetime.timedelta):
+        try:
+            return var0 / var1
+        except:
+            return None
+    return None
+
+
+def _negate(var):
+    '''
+    unary minus
+    '''
+    if isinstance(var, bool):
+        return not var
+    if isinstance(var, int):                # Year, month duration
+        return -var
+    if isinstance(var, float):
+        return -var
+    return None
+
+
+def _equals(expr0, expr1):
+    '''
+    expression = expression
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if (isinstance(expr0, list) and (len(expr0) == 1)):
+        x0 = expr0[0]
+    else:
+        x0 = expr0
+    if (isinstance(expr1, list) and (len(expr1) == 1)):
+        x1 = expr1[0]
+    else:
+        x1 = expr1
+    if x0 is None:
+        if x1 is None:
+            return True
+        return False
+    if x1 is None:
+        return False
+    if isinstance(x0, bool):
+        if not isinstance(x1, bool):
+            return None
+        return x0 == x1
+    if isinstance(x1, bool):
+        if not isinstance(x0, bool):
+            return None
+        return x0 == x1
+    if type(x0) != type(x1):
+        return None
+    if isinstance(x0, datetime.datetime):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    if isinstance(x0, datetime.time):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    try:
+        return x0 == x1
+    except:
+        return False
+
+
+def _notEquals(expr0, expr1):
+    '''
+    expression != expression
+    For convenience of notation, a singleton list L,
+    when used in an expression where a list is not expected, behaves as if L[1] is written.
+    '''
+    if (isinstance(expr0, list) and (len(expr0) == 1)):
+        x0 = expr0[0]
+    else:
+        x0 = expr0
+    if (isinstance(expr1, list) and (len(expr1) == 1)):
+        x1 = expr1[0]
+    else:
+        x1 = expr1
+    if x0 is None:
+        if x1 is None:
+            return False
+        return True
+    if x1 is None:
+        return True
+    if isinstance(x0, bool):
+        if not isinstance(x1, bool):
+            return None
+        return x0 != x1
+    if isinstance(x1, bool):
+        if not isinstance(x0, bool):
+            return None
+        return x0 != x1
+    if type(x0) != type(x1):
+        return None
+    if isinstance(x0, datetime.datetime):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    if isinstance(x0, datetime.time):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    try:
+        return x0 != x1
+    except:
+        return True
+
+
+def _below(expr, ltrange):
+    ''' expression < expression (or <=) - the expression against a less than range '''
+    (end0, lowVal, highVal, end1) = ltrange
+    if (isinstance(expr, list) and (len(expr) == 1)):
+        x0 = expr[0]
+    else:
+        x0 = expr
+    if (isinstance(highVal, list) and (len(highVal) == 1)):
+        x1 = highVal[0]
+    else:
+        x1 = highVal
+    if isinstance(x0, bool):
+        return False
+    if isinstance(x1, bool):
+        return False
+    if type(x0) != type(x1):
+        return None
+    if isinstance(x0, datetime.datetime):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    if isinstance(x0, datetime.time):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    try:
+        if end1 == ')':
+            return x0 < x1
+        else:
+            return x0 <= x1
+    except:
+        return False
+
+
+def _above(expr, gtrange):
+    ''' expression > expression (or >=) - the expression against a greater than range '''
+    (end0, lowVal, highVal, end1) = gtrange
+    if (isinstance(expr, list) and (len(expr) == 1)):
+        x0 = expr[0]
+    else:
+        x0 = expr
+    if (isinstance(lowVal, list) and (len(lowVal) == 1)):
+        x1 = lowVal[0]
+    else:
+        x1 = lowVal
+    if isinstance(x0, bool):
+        return False
+    if isinstance(x1, bool):
+        return False
+    if type(x0) != type(x1):
+        return None
+    if isinstance(x0, datetime.datetime):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    if isinstance(x0, datetime.time):
+        if x0.tzinfo is not None:
+            if x1.tzinfo is None:
+                tzinfo = x0.tzinfo
+                x1 = x1.replace(tzinfo=tzinfo)
+        elif x1.tzinfo is not None:
+            tzinfo = x1.tzinfo
+            x0 = x0.replace(tzinfo=tzinfo)
+    try:
+        if end0 == '(':
+            return x0 > x1
+        else:
+            return x0 >= x1
+    except:
+        return False
+
+
+def _and(expr0, expr1):
+    ''' and in FEEL three-valued logic '''
+    if isinstance(expr0, bool):
+        if isinstance(expr1, bool):
+            return expr0 and expr1  # True/True, True/False, False/True, False/False
+        if not expr0:
+            return False    # False/Otherwise
+        else:
+            return None     # True/Otherwise
+    elif isinstance(expr1, bool):
+        if not expr1:
+            return False    # Otherwise/False
+        else:
+            return None     # Otherwise/True
+    else:
+        return None         # Otherwise/Otherwise
+
+
+def _or(expr0, expr1):
+    ''' or in FEEL three-valued logic '''
+    if isinstance(expr0, bool):
+        if isinstance(expr1, bool):
+            return expr0 or expr1  # True/True, True/False, False/True, False/False
+        if expr0:         # True/Otherwise
+            return True
+        else:               # False/Otherwise
+            return None
+    elif isinstance(expr1, bool):
+        if expr1:     # Otherwise/True
+            return True
+        else:           # Otherwise/False
+            return None
+    else:
+        return None     # Otherwise/Otherwise
+
+
+def _isIn(value, container):
+    ''' value in a list, a range or a context, or equal to a value '''
+    # This is 'in' as in 'in a list' or 'in a range' or simply 'in' as an alternative to '='
+    # Grammer Rule 49.c
+    if isinstance(container, tuple) and (len(container) == 4):      # in a range
+        return Range.fromValue(container).contains(value)
+    elif isinstance(container, list):     # in a list
+        for i in range(len(container)):
+            if isinstance(container[i], tuple) and (len(container[i]) == 4):
+                if Range.fromValue(container[i]).contains(value):
+                    return True
+            elif isinstance(container, dict):     # in a dict
+                if isinstance(value, dict):      # dictionary is a subset of a dictionary
+                    for thisKey in value:
+                        if thisKey not in container:
+                            break
+                        if type(value[thisKey]) != type(container[thisKey]):
+                            break
+                        if value[thisKey] != container[thisKey]:
+                            break
+                    else:
+                        return True
+                    continue
+                else:
+                    return False
+            elif value == container[i]:
+                return True
+        return False
+    elif isinstance(container, dict):     # in a dict
+        if isinstance(value, dict):      # dictionary is a subset of a dictionary
+            for thisKey in value:
+                if thisKey not in container:
+                    return False
+                if type(value[thisKey]) != type(container[thisKey]):
+                    return False
+                if value[thisKey] != container[thisKey]:
+                    return False
+            return True
+        else:
+            return False
+    elif (value is None) and (container is None):
+         return True
+    elif isinstance(value, bool) and isinstance(container, bool):
+         return value == container
+    elif isinstance(value, str) and isinstance(container, str):
+         return value == container
+    elif (type(value) == int) and (type(container) == int):             # Year, month durations
+        return value == container
+    elif isinstance(value, float) and isinstance(container, float):
+        return value == container
+    elif isinstance(value, datetime.date) and isinstance(container, datetime.date):         # True for both dates and datetimes
+        return value == container
+    elif isinstance(value, datetime.time) and isinstance(container, datetime.time):
+        return value == container
+    elif isinstance(value, datetime.timedelta) and isinstance(container, datetime.timedelta):
+        return value == container
+    else:
+        return None
+
+
+MEMO_SIZE = 1024                # The default number of results that CompiledExpression.memoize() keeps
+
+
+def _fingerprint(value):
+    '''
+    A hashable fingerprint of the value of a name, for memoized results.
+    Fingerprints are equal only if the values are the same type and equal (true is not 1, 0 is not -0)
+    and, for dates and times, have the same time zone. Lists and contexts are fingerprinted by their contents,
+    so changing them in place changes their fingerprint. Raises TypeError if the value can't be fingerprinted
+    '''
+    if isinstance(value, list):
+        return (_LIST_KEY,) + tuple(_fingerprint(item) for item in value)
+    if isinstance(value, dict):
+        return (_CONTEXT_KEY, frozenset((key, _fingerprint(item)) for (key, item) in value.items()))
+    if isinstance(value, tuple):
+        return (type(value),) + tuple(_fingerprint(item) for item in value)
+    if isinstance(value, float):
+        return (float, value if value else repr(value))
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return (type(value), value, repr(value.tzinfo))
+    if not isinstance(value, HASHED_TYPES):
+        raise TypeError(f'{type(value).__name__} values are not memoized')
+    return (type(value), value)
+
+
+def _copyResult(result):
+    ''' A copy of a memoized (status, value) that the caller can change '''
+    (status, value) = result
+    if 'errors' in status:
+        status = {'errors': list(status['errors'])}
+    else:
+        status = {}
+    copier = _constantCopy(value)
+    if copier is not None:
+        value = copier(value)
+    return (status, value)
+
+
 class SFeelParser(Parser):
     # debugfile = 'parser.out'
     tokens = SFeelLexer.tokens
 
     precedence = (
+        ('left', QUANTIFIED),
         ('left', NAME),
         ('left', EQUALS, NOTEQUALS, LTTHANEQUAL, GTTHANEQUAL, LTTHAN, GTTHAN),
         ('left', PLUS, MINUS),
@@ -285,17 +1604,132 @@ class SFeelParser(Parser):
         )
 
 
-    def __init__(self):
+    @classmethod
+    def _Parser__build_lrtables(cls):
+        '''
+        Load the LALR tables saved for this grammar, rather than building them, if possible
+        '''
+        signature = _parseTablesSignature(cls._grammar)
+        lrtable = _loadParseTables(cls._grammar, signature)
+        if lrtable is not None:
+            cls._lrtable = lrtable
+            return True
+        if not Parser._Parser__build_lrtables.__func__(cls):
+            return False
+        _saveParseTables(cls._lrtable, signature)
+        return True
+
+    def __init__(self, cacheSize=0):
         self.names = {}
-        self.contextNames = []
+        self.contextNames = ScopeChain()
         self.inContext = 0
         self.errors = []
         self.lexer = SFeelLexer()
+        self.cacheSize = cacheSize          # sFeelParse() caches this many CompiledExpressions (0 means no caching)
+        self.cacheLock = threading.Lock()
+        self.listIndexes = OrderedDict()    # Indexes of long lists, by id(list), for list contains() and index of()
+        self.listIndexLock = threading.Lock()
+        self.clearCache()
+
+    def __getstate__(self):
+        # Locks, lexers and caches can't be pickled - an unpickled parser has the same names and cache size, and empty caches
+        return {'names': self.names, 'cacheSize': self.cacheSize}
+
+    def __setstate__(self, state):
+        self.__init__(cacheSize=state['cacheSize'])
+        self.names = state['names']
+
+    def evaluationContext(self, names=None):
+        """
+        Create an evaluation context
+
+        This routine returns a new SFeelParser, for a single lex, parse or evaluation, that shares this parser's names,
+        but has its own errors, context names, lexer (created when it first lexes) and parsing state - so that one parser can be used by many threads.
+
+        Args:
+            param1 (dict): The names (variables) for the evaluation context - defaults to this parser's names.
+
+        Returns:
+            SFeelParser: the evaluation context
+        """
+
+        context = SFeelParser.__new__(SFeelParser)
+        context.names = self.names if names is None else names
+        context.contextNames = ScopeChain()
+        context.inContext = 0
+        context.errors = []
+        context.lexer = None                # Created by sFeelTokens() - evaluating an expression tree doesn't lex
+        context.tokens = iter(())           # So that error() does not consume tokens when evaluating an expression tree
+        context.listIndexes = self.listIndexes
+        context.listIndexLock = self.listIndexLock
+        return context
 
     def clearErrors(self):
         self.errors = []
         return
 
+    def clearCache(self):
+        with self.cacheLock:
+            self.parseCache = OrderedDict()
+            self.cacheHits = 0
+            self.cacheMisses = 0
+            self.cacheEvictions = 0
+        with self.listIndexLock:
+            self.listIndexes.clear()
+        return
+
+    def cacheInfo(self):
+        ''' Return the sFeelParse() cache statistics '''
+        with self.cacheLock:
+            return {'hits': self.cacheHits, 'misses': self.cacheMisses, 'evictions': self.cacheEvictions,
+                    'size': len(self.parseCache), 'maxSize': self.cacheSize}
+
+    def regexCacheInfo(self):
+        ''' Return the statistics of the (module wide) cache of compiled matches(), replace() and split() patterns '''
+        info = _compileRegex.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxSize': info.maxsize}
+
+    def listIndex(self, thisList):
+        '''
+        Return the index (item hash key -> positions) of a long list, or None if the list should be searched.
+        A list of strings, numbers, booleans, nulls, dates, times and durations is indexed the second time it is used.
+        The index is kept until the list is reassigned (name <- expression), set or reported as changed in an EvaluationSession,
+        forgotten (forgetListIndex()) or changes length - a list that is changed in place must be forgotten
+        '''
+        if len(thisList) < LIST_INDEX_MIN:
+            return None
+        listId = id(thisList)
+        with self.listIndexLock:
+            known = self.listIndexes.get(listId)
+            if (known is None) or ((known[0] is not None) and (known[0] is not thisList)):
+                # First use - remember the length only, so that no reference to the list is kept
+                self.listIndexes[listId] = (None, len(thisList), None)
+                while len(self.listIndexes) > LIST_INDEX_SIZE:
+                    self.listIndexes.popitem(last=False)
+                return None
+            self.listIndexes.move_to_end(listId)
+            if (known[0] is thisList) and (known[1] == len(thisList)):
+                return known[2]
+        if not all(isinstance(item, HASHED_TYPES) for item in thisList):
+            # Lists and contexts can be changed without changing the list - search lists that hold them
+            index = None
+        else:
+            index = {}
+            for position, item in enumerate(thisList, start=1):
+                index.setdefault(item, []).append(position)
+        with self.listIndexLock:
+            if listId in self.listIndexes:
+                # The list is kept (which stops its id being reused) while it is indexed
+                self.listIndexes[listId] = (thisList, len(thisList), index)
+        return index
+
+    def forgetListIndex(self, thisList):
+        '''
+        Discard the index of a list that is no longer current - e.g. a list in the names that has been changed in place
+        '''
+        with self.listIndexLock:
+            self.listIndexes.pop(id(thisList), None)
+
     def collectErrors(self):
         knownErrors = self.errors
         self.errors = []
@@ -303,6 +1737,8 @@ class SFeelParser(Parser):
 
     @_('NAME ASSIGN expr')
     def statement(self, p):
+        if isinstance(self.names.get(p.NAME), list):
+            self.forgetListIndex(self.names[p.NAME])
         self.names[p.NAME] = p.expr
         return p.expr
 
@@ -314,389 +1750,16 @@ class SFeelParser(Parser):
     def expr(self, p):
         return None
 
-    def someFunc(self, name0, thisList, name1, relop, thisValue):
-        # Some in a list of value, or a list of dictionaries
-        if not isinstance(thisList, list):
-            return None
-        if name0 == name1:
-            thisKey = None
-            isValues = True
-        elif name1.startswith(name0 + '.'):
-            thisKey = name1[len(name0) + 1:]
-            isValues = False
-        else:
-            return None
-        for i in range(len(thisList)):
-            if isValues:
-                if thisList[i] == thisValue:
-                    return True
-            else:
-                if not isinstance(thisList[i], dict):
-                    continue
-                if thisKey not in thisList[i].keys():
-                    continue
-                if relop == '=':
-                    if thisList[i][thisKey] == thisValue:
-                        return True
-                elif relop == '!=':
-                    if thisList[i][thisKey] != thisValue:
-                        return True
-                elif relop == '<':
-                    if thisList[i][thisKey] < thisValue:
-                        return True
-                elif relop == '>':
-                    if thisList[i][thisKey] > thisValue:
-                        return True
-                elif relop == '<=':
-                    if thisList[i][thisKey] <= thisValue:
-                        return True
-                elif relop == '>=':
-                    if thisList[i][thisKey] >= thisValue:
-                        return True
-                else:
-                    return None
-        return False
-
-    @_('SOME NAME IN expr SATISFIES NAME EQUALS expr')
-    def expr(self, p):
-        # Some in a list of value, or a list of dictionaries
-        return self.someFunc(p.NAME0, p.expr0, p.NAME1, p.EQUALS, p.expr1)
-
-    @_('SOME NAME IN expr SATISFIES NAME NOTEQUALS expr')
-    def expr(self, p):
-        # Some in a list of value, or a list of dictionaries
-        return self.someFunc(p.NAME0, p.expr0, p.NAME1, p.NOTEQUALS, p.expr1)
-
-    @_('SOME NAME IN expr SATISFIES NAME ltrange')
-    def expr(self, p):
-        (end0, lowVal, highVal, end1) = p.ltrange
-        # Some in a list of value, or a list of dictionaries
-        if end1 == ')':
-            return self.someFunc(p.NAME0, p.expr, p.NAME1, '<', highVal)
-        else:
-            return self.someFunc(p.NAME0, p.expr, p.NAME1, '<=', highVal)
-
-    @_('SOME NAME IN expr SATISFIES NAME gtrange')
-    def expr(self, p):
-        # Some in a list of value, or a list of dictionaries
-        (end0, lowVal, highVal, end1) = p.gtrange
-        if end0 == '(':
-            return self.someFunc(p.NAME0, p.expr, p.NAME1, '>', lowVal)
-        else:
-            return self.someFunc(p.NAME0, p.expr, p.NAME1, '>=', lowVal)
-
-    @_('SOME NAME IN expr SATISFIES NOTFUNC NAME RPAREN', 'SOME NAME IN expr SATISFIES ODDFUNC NAME RPAREN', 'SOME NAME IN expr SATISFIES EVENFUNC NAME RPAREN')
-    def expr(self, p):
-        if not isinstance(p[3], list):
-            return None
-        if p[1] != p[6]:
-            return None
-        for i in p[3]:
-            if p[5] == 'not(':
-                if not isinstance(i, bool):
-                    continue
-                if not i:
-                    return True
-            elif p[5] == 'odd(':
-                if not isinstance(i, float):
-                    continue
-                if not i.is_integer():
-                    continue
-                if (int(i) % 2) == 1:
-                    return True
-            elif p[5] == 'even(':
-                if not isinstance(i, float):
-                    continue
-                if not i.is_integer():
-                    continue
-                if (int(i) % 2) == 0:
-                    return True
-        return False
-
-    def everyFunc(self, name0, thisList, name1, relop, thisValue):
-        # Some in a list of value, or a list of dictionaries
-        if not isinstance(thisList, list):
-            return None
-        if name0 == name1:
-            thisKey = None
-            isValues = True
-        elif name1.startswith(name0 + '.'):
-            thisKey = name1[len(name0) + 1:]
-            isValues = False
-        else:
-            return None
-        for i in range(len(thisList)):
-            if isValues:
-                if thisList[i] != thisValue:
-                    return False
-            else:
-                if not isinstance(thisList[i], dict):
-                    return False
-                if thisKey not in thisList[i].keys():
-                    return False
-                if relop == '=':
-                    if thisList[i][thisKey] != thisValue:
-                        return False
-                elif relop == '!=':
-                    if thisList[i][thisKey] == thisValue:
-                        return False
-                elif relop == '<':
-                    if thisList[i][thisKey] >= thisValue:
-                        return False
-                elif relop == '>':
-                    if thisList[i][thisKey] <= thisValue:
-                        return False
-                elif relop == '<=':
-                    if thisList[i][thisKey] > thisValue:
-                        return False
-                elif relop == '>=':
-                    if thisList[i][thisKey] < thisValue:
-                        return False
-                else:
-                    return None
-        return True
-
-    @_('EVERY NAME IN expr SATISFIES NAME EQUALS expr')
+    @_('SOME NAME IN expr SATISFIES expr %prec QUANTIFIED', 'EVERY NAME IN expr SATISFIES expr %prec QUANTIFIED')
     def expr(self, p):
-        # Every in a list of value, or a list of dictionaries
-        return self.everyFunc(p.NAME0, p.expr0, p.NAME1, p.EQUALS, p.expr1)
-
-    @_('EVERY NAME IN expr SATISFIES NAME NOTEQUALS expr')
-    def expr(self, p):
-        # Every in a list of value, or a list of dictionaries
-        return self.everyFunc(p.NAME0, p.expr0, p.NAME1, p.NOTEQUALS, p.expr1)
-
-    @_('EVERY NAME IN expr SATISFIES NAME ltrange')
-    def expr(self, p):
-        # Every in a list of value, or a list of dictionaries
-        (end0, lowVal, highVal, end1) = p.ltrange
-        if end1 == ')':
-            return self.everyFunc(p.NAME0, p.expr, p.NAME1, '<', highVal)
-        else:
-            return self.everyFunc(p.NAME0, p.expr, p.NAME1, '<=', highVal)
-
-    @_('EVERY NAME IN expr SATISFIES NAME gtrange')
-    def expr(self, p):
-        # Every in a list of value, or a list of dictionaries
-        (end0, lowVal, highVal, end1) = p.gtrange
-        if end0 == '(':
-            return self.everyFunc(p.NAME0, p.expr, p.NAME1, '>', lowVal)
-        else:
-            return self.everyFunc(p.NAME0, p.expr, p.NAME1, '>=', lowVal)
-
-    @_('EVERY NAME IN expr SATISFIES NOTFUNC NAME RPAREN', 'EVERY NAME IN expr SATISFIES ODDFUNC NAME RPAREN', 'EVERY NAME IN expr SATISFIES EVENFUNC NAME RPAREN')
-    def expr(self, p):
-        if not isinstance(p[3], list):
-            return None
-        if p[1] != p[6]:
-            return None
-        for i in p[3]:
-            if p[5] == 'not(':
-                if not isinstance(i, bool):
-                    return False
-                if i:
-                    return False
-            elif p[5] == 'odd(':
-                if not isinstance(i, float):
-                    return False
-                if not i.is_integer():
-                    return False
-                if (int(i) % 2) != 1:
-                    return False
-            elif p[5] == 'even(':
-                if not isinstance(i, float):
-                    return False
-                if not i.is_integer():
-                    return False
-                if (int(i) % 2) != 0:
-                    return False
-        return True
+        # Some/every in a list of values, or a list of dictionaries
+        # The 'satisfies' expression has to be evaluated once for each item in the list, with NAME bound to that item.
+        # That is done by _SomeNode/_EveryNode in the compiled expression tree (sFeelParse() compiles S-FEEL text with 'some' or 'every' in it)
+        return None
 
     @_('expr IN expr', 'expr IN ltrange', 'expr IN gtrange')
     def expr(self, p):
-        # This is 'in' as in 'in a list' or 'in a range' or simply 'in' as an alternative to '='
-        # Grammer Rule 49.c
-        if isinstance(p[2], tuple) and (len(p[2]) == 4):      # in a range
-            (end0, lowVal, highVal, end1) = p[2]
-            if isinstance(p[0], str):
-                if lowVal is None:
-                    if not isinstance(highVal, str):
-                        return False
-                elif highVal is None:
-                    if not isinstance(lowVal, str):
-                        return False
-                elif not isinstance(lowVal, str) or not isinstance(highVal, str):
-                    return False
-            elif type(p[0]) == int:              # Year, month durations
-                if lowVal is None:
-                    if type(highVal) != int:
-                        return False
-                elif highVal is None:
-                    if type(lowVal) != int:
-                        return False
-                elif (type(lowVal) != int) or (type(highVal) != int):
-                    return False
-            elif isinstance(p[0], float):
-                if lowVal is None:
-                    if not isinstance(highVal, float):
-                        return False
-                elif highVal is None:
-                    if not isinstance(lowVal, float):
-                        return False
-                elif not isinstance(lowVal, float) or not isinstance(highVal, float):
-                    return False
-            elif isinstance(p[0], datetime.date):                # True for both dates and datetimes
-                if lowVal is None:
-                    if not isinstance(highVal, datetime.date):
-                        return False
-                elif highVal is None:
-                    if not isinstance(lowVal, datetime.date):
-                        return False
-                if (not isinstance(lowVal, datetime.date)) and (not isinstance(highVal, datetime.date)):
-                    return False
-            elif isinstance(p[0], datetime.time):
-                if lowVal is None:
-                    if not isinstance(highVal, datetime.time):
-                        return False
-                elif highVal is None:
-                    if not isinstance(lowVal, datetime.time):
-                        return False
-                elif (not isinstance(lowVal, datetime.time)) or (not isinstance(highVal, datetime.time)):
-                    return False
-            elif isinstance(p[0], datetime.timedelta):
-                if lowVal is None:
-                    if not isinstance(highVal, datetime.timedelta):
-                        return False
-                elif highVal is None:
-                    if not isinstance(lowVal, datetime.timedelta):
-                        return False
-                elif (not isinstance(lowVal, datetime.timedelta)) or (not isinstance(highVal, datetime.timedelta)):
-                    return False
-            else:
-                return False
-            if (lowVal is not None) and (lowVal > p[0]):
-                return False
-            if (highVal is not None) and (highVal < p[0]):
-                return False
-            if (end0 != '[') and (lowVal is not None) and (lowVal == p[0]):
-                return False
-            if (end1 != ']') and (highVal is not None) and (highVal == p[0]):
-                return False
-            return True
-        elif isinstance(p[2], list):     # in a list
-            for i in range(len(p[2])):
-                if isinstance(p[2][i], tuple) and (len(p[2][i]) == 4):
-                    (end0, lowVal, highVal, end1) = p[2][i]
-                    if isinstance(p[0], str):
-                        if lowVal is None:
-                            if  not isinstance(highVal, str):
-                                continue
-                        elif highVal is None:
-                            if not isinstance(lowVal, str):
-                                continue
-                        elif not isinstance(lowVal, str) or not isinstance(highVal, str):
-                            continue
-                    elif type(p[0]) == int:              # Year, month durations
-                        if lowVal is None:
-                            if type(highVal) != int:
-                                continue
-                        elif highVal is None:
-                            if type(lowVal) != int:
-                                continue
-                        elif (type(lowVal) != int) or (type(highVal) != int):
-                            continue
-                    elif isinstance(p[0], float):
-                        if lowVal is None:
-                            if not isinstance(highVal, float):
-                                continue
-                        elif highVal is None:
-                            if not isinstance(lowVal, float):
-                                continue
-                        elif not isinstance(lowVal, float) or not isinstance(highVal, float):
-                            continue
-                    elif isinstance(p[0], datetime.date):                # True for both dates and datetimes
-                        if lowVal is None:
-                            if not isinstance(highVal, datetime.date):
-                                continue
-                        elif highVal is None:
-                            if not isinstance(lowVal, datetime.date):
-                                continue
-                        elif (not isinstance(lowVal, datetime.date)) or (not isinstance(highVal, datetime.date)):
-                            continue
-                    elif isinstance(p[0], datetime.time):
-                        if lowVal is None:
-                            if not isinstance(highVal, datetime.time):
-                                continue
-                        elif highVal is None:
-                            if not isinstance(lowVal, datetime.time):
-                                continue
-                        elif (not isinstance(lowVal, datetime.time)) or (not isinstance(highVal, datetime.time)):
-                            continue
-                    elif isinstance(p[0], datetime.timedelta):
-                        if (lowVal is None) and not isinstance(highVal, datetime.timedelta):
-                            return False
-                        elif (highVal is None) and not isinstance(lowVal, datetime.timedelta):
-                            return False
-                        elif (not isinstance(lowVal, datetime.timedelta)) or (not isinstance(highVal, datetime.timedelta)):
-                            continue
-                    else:
-                        return False
-                    if (lowVal is not None) and (lowVal > p[0]):
-                        continue
-                    if (highVal is not None) and (highVal < p[0]):
-                        continue
-                    if (end0 != '[') and (lowVal is not None) and (lowVal == p[0]):
-                        continue
-                    if (end1 != ']') and (highVal is not None) and (highVal == p[0]):
-                        continue
-                    return True
-                elif isinstance(p[2], dict):     # in a dict
-                    if isinstance(p[0], dict):      # dictionary is a subset of a dictionary
-                        for thisKey in p[0]:
-                            if thisKey not in p[2]:
-                                break
-                            if type(p[0][thisKey]) != type(p[2][thisKey]):
-                                break
-                            if p[0][thisKey] != p[2][thisKey]:
-                                break
-                        else:
-                            return True
-                        continue
-                    else:
-                        return False
-                elif p[0] == p[2][i]:
-                    return True
-            return False
-        elif isinstance(p[2], dict):     # in a dict
-            if isinstance(p[0], dict):      # dictionary is a subset of a dictionary
-                for thisKey in p[0]:
-                    if thisKey not in p[2]:
-                        return False
-                    if type(p[0][thisKey]) != type(p[2][thisKey]):
-                        return False
-                    if p[0][thisKey] != p[2][thisKey]:
-                        return False
-                return True
-            else:
-                return False
-        elif (p[0] is None) and (p[2] is None):
-             return True
-        elif isinstance(p[0], bool) and isinstance(p[2], bool):
-             return p[0] == p[2]
-        elif isinstance(p[0], str) and isinstance(p[2], str):
-             return p[0] == p[2]
-        elif (type(p[0]) == int) and (type(p[2]) == int):             # Year, month durations
-            return p[0] == p[2]
-        elif isinstance(p[0], float) and isinstance(p[2], float):
-            return p[0] == p[2]
-        elif isinstance(p[0], datetime.date) and isinstance(p[2], datetime.date):         # True for both dates and datetimes
-            return p[0] == p[2]
-        elif isinstance(p[0], datetime.time) and isinstance(p[2], datetime.time):
-            return p[0] == p[2]
-        elif isinstance(p[0], datetime.timedelta) and isinstance(p[2], datetime.timedelta):
-            return p[0] == p[2]
-        else:
-            return None
+        return _isIn(p[0], p[2])
 
     @_('LPAREN expr RPAREN', 'LPAREN ltrange RPAREN', 'LPAREN gtrange RPAREN')
     def expr(self, p):
@@ -704,345 +1767,44 @@ class SFeelParser(Parser):
 
     @_('expr PLUS expr')
     def expr(self, p):
-        '''
-        Add two expressions
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if isinstance(p.expr0, list) and (len(p.expr0) == 1):
-            var0 = p.expr0[0]
-        else:
-            var0 = p.expr0
-        if isinstance(p.expr1, list) and (len(p.expr1) == 1):
-            var1 = p.expr1[0]
-        else:
-            var1 = p.expr1
-        if isinstance(var0, list) and isinstance(var1, list):       # Concatentation of two lists
-            return var0 + var1
-        if isinstance(var0, list):                                  # Append to a list
-            return var0 + list(var1)
-        if isinstance(var1, list):                                  # Prepend to a list
-            return list(var0) + var1
-        if (type(var0) == int) and (type(var1) == int):         #  Addition of two durations(yearMonth)
-            return var0 + var1
-        if isinstance(var0, float) and isinstance(var1, float):
-            return var0 + var1
-        if isinstance(var0, str) and isinstance(var1, str):         # Concatenation of strings
-            return var0 + var1
-        if isinstance(var0, datetime.date):                     # True for both dates and datetimes
-            if isinstance(var1, datetime.timedelta):            # date/datetime plus days and time duration
-                return var0 + var1
-            elif type(var1) == int:                       # date/datetime plus year and month duration
-                year = (var0).year
-                month = (var0).month + var1
-                while month < 1:                                # Allow for addition of a negative duration
-                    year -= 1
-                    month += 12
-                while month > 12:                               # Bring month into range 1-12
-                    year += 1
-                    month -= 12
-                try:
-                    newDate = (var0).replace(year=int(year), month=int(month))
-                except:
-                    newDate = (var0).replace(year=int(year), month=int(month), day=28)
-                return newDate
-            else:
-                return None
-        if isinstance(var1, datetime.date):                 # True for both dates and datetimes
-            if isinstance(var0, datetime.timedelta):         # day and time duration plus date/datetime
-                return var0 + var1
-            elif type(var0) == int:                    # year and month duration plus date/datetime
-                year = (var1).year
-                month = (var1).month + var0
-                while month < 1:                            # Allow for the addtion of a negative duration
-                    year -= 1
-                    month += 12
-                while month > 12:                           # Bring month into range 1-12
-                    year += 1
-                    month -= 12
-                try:
-                    newDate = (var1).replace(year=int(year), month=int(month))
-                except:
-                    newDate = (var1).replace(year=int(year), month=int(month), day=28)
-                return newDate
-            else:
-                return None
-        if isinstance(var0, datetime.time) and isinstance(var1, datetime.timedelta):        # date or datetime plus days and time duration
-            return (datetime.datetime.combine(datetime.date.today(), var0) + var1).timetz()
-        if isinstance(var1, datetime.time) and isinstance(var0, datetime.timedelta):        # days and time duration plus date or datetime
-            return (datetime.datetime.combine(datetime.date.today(), var1) + var0).timetz()
-        if isinstance(var0, datetime.timedelta) and isinstance(var1, datetime.timedelta):   # days and time duration plus days and time duration
-            return var0 + var1
-        return None
+        ''' Add two expressions '''
+        return _add(p.expr0, p.expr1)
 
     @_('expr MINUS expr')
     def expr(self, p):
-        '''
-        Subtract two expressions
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if isinstance(p.expr0, list) and (len(p.expr0) == 1):
-            var0 = p.expr0[0]
-        else:
-            var0 = p.expr0
-        if isinstance(p.expr1, list) and (len(p.expr1) == 1):
-            var1 = p.expr1[0]
-        else:
-            var1 = p.expr1
-        if (type(var0) == int) and (type(var1) == int):         # Subtraction of two durations(yearMonth)
-            return var0 - var1
-        if isinstance(var0, float) and isinstance(var1, float):
-            return var0 - var1
-        if isinstance(var0, datetime.date):                         # True for both dates and datetimes
-            if isinstance(var1, datetime.date):             # date or datetime minus date or datetime
-                try:
-                    return var0 - var1
-                except:
-                    return None
-            if isinstance(var1, datetime.timedelta):         # date/datetime minus days and time duration
-                return var0 - var1
-            if type(var1) == int:                       # date/datetime minus years and months duration
-                year = (var0).year
-                month = (var0).month - p.expr1
-                while month > 12:
-                    year += 1
-                    month -= 12
-                while month < 1:
-                    year -= 1
-                    month += 12
-                try:
-                    newDate = (var0).replace(year=int(year), month=int(month))
-                except:
-                    newDate = (var0).replace(year=int(year), month=int(month), day=28)
-                return newDate
-            else:
-                return None
-        elif isinstance(var0, datetime.time):            # time minus time or days and time duration
-            if isinstance(var1, datetime.time):               # time minus time
-                return datetime.datetime.combine(datetime.date.today(), var0) - datetime.datetime.combine(datetime.date.today(), var1)
-            elif isinstance(var1, datetime.timedelta):        # time minus days and time duration
-                return (datetime.datetime.combine(datetime.date.today(), var0) - var1).timetz()
-            else:
-                return None
-        elif isinstance(var0, datetime.timedelta) and isinstance(var1, datetime.timedelta):       # days and time duration minus days and time duration
-            return var0 - var1
-        else:
-            return None
+        ''' Subtract two expressions '''
+        return _subtract(p.expr0, p.expr1)
 
     @_('expr EXPONENT expr')
     def expr(self, p):
-        '''
-        expression power expression
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if isinstance(p.expr0, list) and (len(p.expr0) == 1):
-            var0 = p.expr0[0]
-        else:
-            var0 = p.expr0
-        if isinstance(p.expr1, list) and (len(p.expr1) == 1):
-            var1 = p.expr1[0]
-        else:
-            var1 = p.expr1
-        if isinstance(var0, float) and isinstance(var1, float):
-            return var0 ** var1
-        else:
-            return None
+        ''' expression power expression '''
+        return _power(p.expr0, p.expr1)
 
     @_('expr MULTIPY expr')
     def expr(self, p):
-        '''
-        multiply two expressions
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if isinstance(p.expr0, list) and (len(p.expr0) == 1):
-            var0 = p.expr0[0]
-        else:
-            var0 = p.expr0
-        if isinstance(p.expr1, list) and (len(p.expr1) == 1):
-            var1 = p.expr1[0]
-        else:
-            var1 = p.expr1
-        if (type(var0) == int) and isinstance(var1, float):               # Year, month duration * number
-            return int(var0 * var1)
-        if isinstance(var0, float) and (type(var1) == int):               # number * Year, month duration
-            return int(var0 * var1)
-        if isinstance(var0, float) and isinstance(var1, float):
-            return var0 * var1
-        if isinstance(var0, datetime.timedelta) and isinstance(var1, float):
-            return var0 * var1
-        if isinstance(var1, datetime.timedelta) and isinstance(var0, float):
-            return var0 * var1
-        return None
+        ''' multiply two expressions '''
+        return _multiply(p.expr0, p.expr1)
 
     @_('expr DIVIDE expr')
     def expr(self, p):
-        '''
-        multiply two expressions
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if isinstance(p.expr0, list) and (len(p.expr0) == 1):
-            var0 = p.expr0[0]
-        else:
-            var0 = p.expr0
-        if isinstance(p.expr1, list) and (len(p.expr1) == 1):
-            var1 = p.expr1[0]
-        else:
-            var1 = p.expr1
-        if isinstance(p.expr1, list) and (len(p.expr1) == 1):
-            var1 = p.expr1[0]
-        else:
-            var1 = p.expr1
-        if var1 == 0:
-            return None
-        if (type(var0) == int) and isinstance(var1, float):               # Year, month duration / number
-            try:
-                return int(var0 / var1)
-            except:
-                 return None
-        if (type(var0) == int) and (type(var1) == int):               # Year, month duration / Year, month duration
-            try:
-                return int(var0 / var1)
-            except:
-                 return None
-        if isinstance(var0, float) and isinstance(var1, float):
-            try:
-                return var0 / var1
-            except:
-                 return None
-        if isinstance(var0, datetime.timedelta) and isinstance(var1, float):
-            try:
-                return var0 / var1
-            except:
-                return None
-        if isinstance(var0, datetime.timedelta) and isinstance(var1, datetime.timedelta):
-            try:
-                return var0 / var1
-            except:
-                return None
-        return None
+        ''' divide two expressions '''
+        return _divide(p.expr0, p.expr1)
 
     @_('MINUS expr %prec UMINUS')
     def expr(self, p):
-        '''
-        unary minus
-        '''
-        var = p.expr
-        if isinstance(var, bool):
-            return not var
-        if isinstance(var, int):                # Year, month duration
-            return -var
-        if isinstance(var, float):
-            return -var
-        return None
+        ''' unary minus '''
+        return _negate(p.expr)
 
     @_('expr EQUALS expr', 'ltrange EQUALS expr', 'expr EQUALS ltrange', 'gtrange EQUALS expr', 'expr EQUALS gtrange',
        'ltrange EQUALS ltrange', 'gtrange EQUALS gtrange', 'ltrange EQUALS gtrange', 'gtrange EQUALS ltrange')
     def expr(self, p):
-        '''
-        expression = expression
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if (isinstance(p.expr0, list) and (len(p.expr0) == 1)):
-            x0 = p.expr0[0]
-        else:
-            x0 = p.expr0
-        if (isinstance(p.expr1, list) and (len(p.expr1) == 1)):
-            x1 = p.expr1[0]
-        else:
-            x1 = p.expr1
-        if x0 is None:
-            if x1 is None:
-                return True
-            return False
-        if x1 is None:
-            return False
-        if isinstance(x0, bool):
-            if not isinstance(x1, bool):
-                return None
-            return x0 == x1
-        if isinstance(x1, bool):
-            if not isinstance(x0, bool):
-                return None
-            return x0 == x1
-        if type(x0) != type(x1):
-            return None
-        if isinstance(x0, datetime.datetime):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        if isinstance(x0, datetime.time):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        try:
-            return x0 == x1
-        except:
-            return False
+        ''' expression = expression '''
+        return _equals(p.expr0, p.expr1)
 
     @_('expr NOTEQUALS expr')
     def expr(self, p):
-        '''
-        expression != expression
-        For convenience of notation, a singleton list L,
-        when used in an expression where a list is not expected, behaves as if L[1] is written.
-        '''
-        if (isinstance(p.expr0, list) and (len(p.expr0) == 1)):
-            x0 = p.expr0[0]
-        else:
-            x0 = p.expr0
-        if (isinstance(p.expr1, list) and (len(p.expr1) == 1)):
-            x1 = p.expr1[0]
-        else:
-            x1 = p.expr1
-        if x0 is None:
-            if x1 is None:
-                return False
-            return True
-        if x1 is None:
-            return True
-        if isinstance(x0, bool):
-            if not isinstance(x1, bool):
-                return None
-            return x0 != x1
-        if isinstance(x1, bool):
-            if not isinstance(x0, bool):
-                return None
-            return x0 != x1
-        if type(x0) != type(x1):
-            return None
-        if isinstance(x0, datetime.datetime):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        if isinstance(x0, datetime.time):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        try:
-            return x0 != x1
-        except:
-            return True
+        ''' expression != expression '''
+        return _notEquals(p.expr0, p.expr1)
 
 
     @_('LBRACKET RBRACKET')
@@ -1493,85 +2255,11 @@ class SFeelParser(Parser):
 
     @_('expr ltrange')
     def expr(self, p):
-        (end0, lowVal, highVal, end1) = p.ltrange
-        if (isinstance(p.expr, list) and (len(p.expr) == 1)):
-            x0 = p.expr[0]
-        else:
-            x0 = p.expr
-        if (isinstance(highVal, list) and (len(highVal) == 1)):
-            x1 = highVal[0]
-        else:
-            x1 = highVal
-        if isinstance(x0, bool):
-            return False
-        if isinstance(x1, bool):
-            return False
-        if type(x0) != type(x1):
-            return None
-        if isinstance(x0, datetime.datetime):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        if isinstance(x0, datetime.time):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        try:
-            if end1 == ')':
-                return x0 < x1
-            else:
-                return x0 <= x1
-        except:
-            return False
+        return _below(p.expr, p.ltrange)
 
     @_('expr gtrange')
     def expr(self, p):
-        (end0, lowVal, highVal, end1) = p.gtrange
-        if (isinstance(p.expr, list) and (len(p.expr) == 1)):
-            x0 = p.expr[0]
-        else:
-            x0 = p.expr
-        if (isinstance(lowVal, list) and (len(lowVal) == 1)):
-            x1 = lowVal[0]
-        else:
-            x1 = lowVal
-        if isinstance(x0, bool):
-            return False
-        if isinstance(x1, bool):
-            return False
-        if type(x0) != type(x1):
-            return None
-        if isinstance(x0, datetime.datetime):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        if isinstance(x0, datetime.time):
-            if x0.tzinfo is not None:
-                if x1.tzinfo is None:
-                    tzinfo = x0.tzinfo
-                    x1 = x1.replace(tzinfo=tzinfo)
-            elif x1.tzinfo is not None:
-                tzinfo = x1.tzinfo
-                x0 = x0.replace(tzinfo=tzinfo)
-        try:
-            if end0 == '(':
-                return x0 > x1
-            else:
-                return x0 >= x1
-        except:
-            return False
+        return _above(p.expr, p.gtrange)
 
     @_('expr BETWEEN expr')
     def betweenExpr(self, p):
@@ -1598,37 +2286,11 @@ class SFeelParser(Parser):
 
     @_('expr andExpr')
     def expr(self, p):
-        if isinstance(p.expr, bool):
-            if isinstance(p.andExpr, bool):
-                return p.expr and p.andExpr  # True/True, True/False, False/True, False/False
-            if not p.expr:
-                return False    # False/Otherwise
-            else:
-                return None     # True/Otherwise
-        elif isinstance(p.andExpr, bool):
-            if not p.andExpr:
-                return False    # Otherwise/False
-            else:
-                return None     # Otherwise/True
-        else:
-            return None         # Otherwise/Otherwise
+        return _and(p.expr, p.andExpr)
 
     @_('expr OR expr')
     def expr(self, p):
-        if isinstance(p.expr0, bool):
-            if isinstance(p.expr1, bool):
-                return p.expr0 or p.expr1  # True/True, True/False, False/True, False/False
-            if p.expr0:         # True/Otherwise
-                return True
-            else:               # False/Otherwise
-                return None
-        elif isinstance(p.expr1, bool):
-            if p.expr1:     # Otherwise/True
-                return True
-            else:           # Otherwise/False
-                return None
-        else:
-            return None     # Otherwise/Otherwise
+        return _or(p.expr0, p.expr1)
 
     @_('NOT expr %prec UMINUS')
     def expr(self, p):
@@ -1647,95 +2309,99 @@ class SFeelParser(Parser):
 
     @_('listPart COMMA expr')
     def listPart(self, p):
+        # Append to the list in place (rather than copying it) so that building a long list literal is linear
+        retval = p.listPart
         if isinstance(p.expr, list):        # A list
             if (len(p.expr) > 0):
-                retval = p.listPart
                 retval.append(p.expr)
-                return retval
             else:                           # A list of only 1 element is treated as value, not a list
-                 return p.listPart + p.expr
+                retval.extend(p.expr)
         else:
-            return p.listPart + [p.expr]
+            retval.append(p.expr)
+        return retval
 
     @_('LCURLY NAME COLON expr', 'LCURLY ITEM COLON expr')
     def contextStart(self, p):
         self.inContext += 1
-        self.contextNames.append({})
-        self.contextNames[-1][p[1]] = p[3]
+        self.contextNames.push()
+        self.contextNames.set(p[1], p[3])
         return {p[1]: p[3]}
 
     @_('LCURLY STRING COLON expr')
     def contextStart(self, p):
         self.inContext += 1
-        self.contextNames.append({})
-        self.contextNames[-1][p[1][1:-1]] = p[3]
+        self.contextNames.push()
+        self.contextNames.set(p[1][1:-1], p[3])
         return {p[1][1:-1]: p[3]}
 
     @_('NAME COLON expr', 'ITEM COLON expr')
     def contextPart(self, p):
         if self.inContext > 0:
-            if p[0] in self.contextNames[-1]:
+            if self.contextNames.inFrame(p[0]):
                 self.error(p[0])
                 return None
             else:
-                self.contextNames[-1][p[0]] = p[2]
+                self.contextNames.set(p[0], p[2])
         return {p[0]: p[2]}
 
     @_('STRING COLON expr')
     def contextPart(self, p):
         if self.inContext > 0:
-            if p[0][1:-1] in self.contextNames[-1]:
+            if self.contextNames.inFrame(p[0][1:-1]):
                 self.error(p[0])
                 return None
             else:
-                self.contextNames[-1][p[0][1:-1]] = p[2]
+                self.contextNames.set(p[0][1:-1], p[2])
         return {p[0][1:-1]: p[2]}
 
     @_('contextPart COMMA contextPart')
     def contextPart(self, p):
         if (p.contextPart0 is None) or (p.contextPart1 is None):
             return None
-        return p.contextPart0 | p.contextPart1
+        # Update the context in place (rather than copying it) so that building a large context literal is linear
+        retval = p.contextPart0
+        retval.update(p.contextPart1)
+        return retval
    
     @_('LTTHAN expr')
     def ltrange(self, p):
-        return ('(', None, p.expr, ')')
+        return Range('(', None, p.expr, ')')
 
     @_('LTTHANEQUAL expr')
     def ltrange(self, p):
-        return ('(', None, p.expr, ']')
+        return Range('(', None, p.expr, ']')
 
     @_('GTTHAN expr')
     def gtrange(self, p):
-        return ('(', p.expr, None, ')')
+        return Range('(', p.expr, None, ')')
 
     @_('GTTHANEQUAL expr')
     def gtrange(self, p):
-        return ('[', p.expr, None, ')')
+        return Range('[', p.expr, None, ')')
 
     @_('LPAREN expr ELLIPSE expr RPAREN')
     def expr(self, p):
-        return ('(', p.expr0, p.expr1, p.RPAREN)
+        return Range('(', p.expr0, p.expr1, p.RPAREN)
 
     @_('LPAREN expr ELLIPSE expr RBRACKET')
     def expr(self, p):
-        return ('(', p.expr0, p.expr1, p.RBRACKET)
+        return Range('(', p.expr0, p.expr1, p.RBRACKET)
 
     @_('LPAREN expr ELLIPSE expr LBRACKET')
     def expr(self, p):
-        return ('(', p.expr0, p.expr1, ')')
+        return Range('(', p.expr0, p.expr1, ')')
 
     @_('listStart ELLIPSE expr RPAREN')
     def expr(self, p):
-        return ('[', p.listStart[0], p.expr, p.RPAREN)
+        return Range('[', p.listStart[0], p.expr, p.RPAREN)
 
     @_('listStart ELLIPSE expr RBRACKET')
     def expr(self, p):
-        return ('[', p.listStart[0], p.expr, p.RBRACKET)
+        return Range('[', p.listStart[0], p.expr, p.RBRACKET)
 
     @_('listStart ELLIPSE expr LBRACKET')
     def expr(self, p):
-        return ('[', p.listStart[0], p.expr, ')')
+        return Range('[', p.listStart[0], p.expr, ')')
 
     @_('contextStart RCURLY')
     def expr(self, p):
@@ -1753,15 +2419,15 @@ class SFeelParser(Parser):
 
     @_('RBRACKET expr ELLIPSE expr RPAREN')
     def expr(self, p):
-        return ('(', p.expr0, p.expr1, p.RPAREN)
+        return Range('(', p.expr0, p.expr1, p.RPAREN)
 
     @_('RBRACKET expr ELLIPSE expr RBRACKET')
     def expr(self, p):
-        return ('(', p.expr0, p.expr1, p.RBRACKET1)
+        return Range('(', p.expr0, p.expr1, p.RBRACKET1)
 
     @_('RBRACKET expr ELLIPSE expr LBRACKET')
     def expr(self, p):
-        return ('(', p.expr0, p.expr1, ')')
+        return Range('(', p.expr0, p.expr1, ')')
 
     @_('listStart RBRACKET')
     def expr(self, p):
@@ -1799,12 +2465,7 @@ class SFeelParser(Parser):
             else:
                 return fromParam
         elif isinstance(fromParam, str):
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("error")
-                    return dateutil.parser.parse(fromParam).date()
-            except:
-                return None
+            return _parseDate(fromParam)
         else:
             return None
 
@@ -1945,11 +2606,8 @@ class SFeelParser(Parser):
                 return datetime.time(hour=0, minute=0, second=0)
         elif isinstance(fromParam, str):
             parts = fromParam.split('@')
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("error")
-                    thisTime =  dateutil.parser.parse(parts[0]).timetz()     # A time with timezone
-            except:
+            thisTime = _parseTime(parts[0])         # A time with timezone
+            if thisTime is None:
                 return None
             if len(parts) == 1:
                 if thisTime.utcoffset() is not None:
@@ -2023,11 +2681,8 @@ class SFeelParser(Parser):
                 subParts = subParts[0].split(':')
                 if len(subParts) > 1:
                     return None
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("error")
-                    thisDateTime = dateutil.parser.parse(parts[0])
-            except:
+            thisDateTime = _parseDateTime(parts[0])
+            if thisDateTime is None:
                 return None
             if len(parts) == 1:
                 if thisDateTime.utcoffset() is not None:
@@ -2225,72 +2880,8 @@ class SFeelParser(Parser):
         for i in range(1,len(thisList)):
             if isinstance(thisList[i], tuple) and (len(thisList[i]) == 4):
                 # This test is 'in a range'
-                (end0, lowVal, highVal, end1) = thisList[i]
-                if isinstance(inValue, str):
-                    if lowVal is None:
-                        if not isinstance(highVal, str):
-                            continue
-                    elif highVal is None:
-                        if not isinstance(lowVal, str):
-                            continue
-                    elif not isinstance(lowVal, str) or not isinstance(highVal, str):
-                        continue
-                elif type(inValue) == int:              # a list of Year, month durations
-                    if lowVal is None:
-                        if type(highVal) != int:
-                            continue
-                    elif highVal is None:
-                        if type(lowVal) != int:
-                            continue
-                    elif (type(lowVal) != int) or (type(highVal) != int):
-                        continue
-                elif isinstance(inValue, float):
-                    if lowVal is None:
-                        if not isinstance(highVal, float):
-                            return False
-                    elif highVal is None:
-                        if not isinstance(lowVal, float):
-                            return False
-                    elif not isinstance(lowVal, float) or not isinstance(highVal, float):
-                        continue
-                elif isinstance(inValue, datetime.date):            # True for both dates and datetimes
-                    if lowVal is None:
-                        if not isinstance(highVal, datetime.date):
-                            continue
-                    elif highVal is None:
-                        if not isinstance(lowVal, datetime.date):
-                            continue
-                    elif not isinstance(lowVal, datetime.date) or not isinstance(highVal, datetime.date):
-                        continue
-                elif isinstance(inValue, datetime.time):
-                    if lowVal is None:
-                        if not isinstance(highVal, datetime.time):
-                            continue
-                    elif highVal is None:
-                        if not isinstance(lowVal, datetime.time):
-                            continue
-                    elif (not isinstance(lowVal, datetime.time)) or (not isinstance(highVal, datetime.time)):
-                        continue
-                elif isinstance(inValue, datetime.timedelta):
-                    if lowVal is None:
-                        if not isinstance(highVal, datetime.timedelta):
-                            continue
-                    elif highVal is None:
-                        if not isinstance(lowVal, datetime.timedelta):
-                            continue
-                    elif not isinstance(lowVal, datetime.timedelta) or not isinstance(highVal, datetime.timedelta):
-                        continue
-                else:
-                    continue
-                if lowVal > inValue:
-                    continue
-                if highVal < inValue:
-                    continue
-                if (end0 != '[') and (lowVal == inValue):
-                    continue
-                if (end1 != ']') and (highVal == inValue):
-                    continue
-                return True
+                if Range.fromValue(thisList[i]).contains(inValue):
+                    return True
             else:
                 if not isinstance(thisList[i], tuple) or (len(thisList[i]) != 2):
                     continue
@@ -2616,21 +3207,21 @@ class SFeelParser(Parser):
     def expr(self, p):
         thisList = p.inStart
         (comparitor, lowVal) = thisList[1]
-        thisList[1] = ('(', lowVal, p.expr, ')')
+        thisList[1] = Range('(', lowVal, p.expr, ')')
         return self.inFunc(thisList)
 
     @_('inStart ELLIPSE expr RBRACKET')
     def expr(self, p):
         thisList = p.inStart
         (comparitor, lowVal) = thisList[1]
-        thisList[1] = ('(', lowVal, p.expr, ']')
+        thisList[1] = Range('(', lowVal, p.expr, ']')
         return self.inFunc(thisList)
 
     @_('inStart ELLIPSE expr LBRACKET')
     def expr(self, p):
         thisList = p.inStart
         (comparitor, lowVal) = thisList[1]
-        thisList[1] = ('(', lowVal, p.expr, ')')
+        thisList[1] = Range('(', lowVal, p.expr, ')')
         return self.inFunc(thisList)
 
     @_('SUBSTRINGFUNC expr COMMA expr RPAREN', 'SUBSTRINGFUNC expr COMMA expr COMMA expr RPAREN',
@@ -2839,20 +3430,11 @@ class SFeelParser(Parser):
             return None
         if not isinstance(replacementParam, str):
             return None
-        reFlags = 0
-        if flagsParam is not None:
-            if not isinstance(flagsParam, str):
-                return None
-            if 's' in flagsParam:
-                reFlags += re.S
-            if 'm' in flagsParam:
-                reFlags += re.M
-            if 'i' in flagsParam:
-                reFlags += re.I
-            if 'x' in flagsParam:
-                reFlags += re.X
-        replace = re.sub(pattern=r'\$(\d+)', repl=lambda x: '\\' + str(int(x.group(1)) + 1), string=replacementParam)    # Convert SFEEL regular expressions to Python
-        return re.sub(pattern=r'(' + patternParam + r')', repl=replace, string=inputParam, flags=reFlags)
+        reFlags = _regexFlags(flagsParam)
+        if reFlags is None:
+            return None
+        (regex, replace) = _compileRegex(patternParam, reFlags, replacementParam)
+        return regex.sub(replace, inputParam)
 
     @_('CONTAINSFUNC expr COMMA expr RPAREN', 'CONTAINSFUNC NAME COLON expr COMMA NAME COLON expr RPAREN')
     def expr(self, p):
@@ -2970,19 +3552,11 @@ class SFeelParser(Parser):
             return None
         if not isinstance(patternParam, str):
             return None
-        reFlags = 0
-        if flagsParam is not None:
-            if not isinstance(flagsParam, str):
-                return None
-            if 's' in flagsParam:
-                reFlags += re.S
-            if 'm' in flagsParam:
-                reFlags += re.M
-            if 'i' in flagsParam:
-                reFlags += re.I
-            if 'x' in flagsParam:
-                reFlags += re.X
-        thisMatch = re.match(patternParam, inputParam, flags=reFlags)
+        reFlags = _regexFlags(flagsParam)
+        if reFlags is None:
+            return None
+        (regex, discard) = _compileRegex(patternParam, reFlags)
+        thisMatch = regex.match(inputParam)
         if thisMatch is not None:
             return True
         return False
@@ -3003,7 +3577,7 @@ class SFeelParser(Parser):
                 else:
                     return None
         if isinstance(stringParam, list) and (len(stringParam) == 1):
-            inputParam = inputParam[0]
+            stringParam = stringParam[0]
         if isinstance(delimiterParam, list) and (len(delimiterParam) == 1):
             delimiterParam = delimiterParam[0]
         if (stringParam is None) or (delimiterParam is None):
@@ -3012,11 +3586,13 @@ class SFeelParser(Parser):
             return None
         if not isinstance(delimiterParam, str):
             return None
-        return re.split(delimiterParam, stringParam)
+        (regex, discard) = _compileRegex(delimiterParam, 0)
+        return regex.split(stringParam)
 
     @_('LISTCONTAINSFUNC expr COMMA expr RPAREN', 'LISTCONTAINSFUNC NAME COLON expr COMMA NAME COLON expr RPAREN')
     def expr(self, p):
         ''' list contains value'''
+        listParam = elementParam = None
         if len(p) == 5:
             listParam = p[1]
             elementParam = p[3]
@@ -3025,7 +3601,7 @@ class SFeelParser(Parser):
                 if (p[i] == 'list') and (listParam is None):
                     listParam = p[i + 2]
                 elif (p[i] == 'element') and (elementParam is None):
-                    elemenntParam = p[i + 2]
+                    elementParam = p[i + 2]
                 else:
                     return None
         if not isinstance(listParam, list):
@@ -3036,6 +3612,12 @@ class SFeelParser(Parser):
             return None
         if not isinstance(listParam, list):
             return None
+        index = self.listIndex(listParam)
+        if index is not None:
+            try:
+                return _hashKey(elementParam) in index
+            except TypeError:
+                pass
         return elementParam in listParam
 
     @_('COUNTFUNC expr RPAREN', 'COUNTFUNC NAME COLON expr RPAREN')
@@ -3515,6 +4097,12 @@ class SFeelParser(Parser):
             return None
         if not isinstance(listParam, list):
             return None
+        index = self.listIndex(listParam)
+        if index is not None:
+            try:
+                return list(index.get(_hashKey(matchParam), []))
+            except TypeError:
+                pass
         newList = []
         for i in range(len(listParam)):
             if listParam[i] == matchParam:
@@ -3536,18 +4124,13 @@ class SFeelParser(Parser):
         # p.unionStart must be a list and p.listPart must be a list of lists
         if p.unionStart is None:
             return None
-        retval = []
-        for i in range(len(p.unionStart)):
-            if p.unionStart[i] not in retval:
-                retval.append(p.unionStart[i])
+        values = list(p.unionStart)
         for i in range(len(p.listPart)):
             if isinstance(p.listPart[i], list):
-                for j in range(len(p.listPart[i])):
-                    if p.listPart[i][j] not in retval:
-                        retval.append(p.listPart[i][j])
+                values.extend(p.listPart[i])
             else:
                 return None
-        return retval
+        return _distinctValues(values)
 
     @_('unionStart RPAREN')
     def expr(self, p):
@@ -3564,11 +4147,7 @@ class SFeelParser(Parser):
             return None
         if not isinstance(listParam, list):
             listParam = [listParam]
-        newList = []
-        for i in range(len(listParam)):
-            if listParam[i] not in newList:
-                newList.append(listParam[i])
-        return newList
+        return _distinctValues(listParam)
 
     def flatten(self, this):
         newList = []
@@ -5683,247 +6262,43 @@ class SFeelParser(Parser):
             return False
 
     def isContextName(self, name):
-        if self.inContext == 0:
-            return False
-        for i in range(len(self.contextNames)):
-            if name in self.contextNames[i]:
-                return True
-        return False
+        return self.getContextValue(name, NO_VALUE) is not NO_VALUE
 
-    def getContextValue(self, name):
-        for i in range(len(self.contextNames) -1, -1, -1):
-            if name in self.contextNames[i]:
-                return self.contextNames[i][name]
-        return  None
+    def getContextValue(self, name, default=None):
+        return self.contextNames.get(name, default)
 
     @_('NAME')
     def expr(self, p):
-        if p.NAME in self.names:
-            return self.names[p.NAME]
-        if self.isContextName(p.NAME):
-            return self.getContextValue(p.NAME)
-        if p.NAME.endswith('.year'):
-            if p.NAME[:-5] in self.names:
-                value = self.names[p.NAME[:-5]]
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.year)
-            elif self.isContextName(p.NAME[:-5]):
-                value = self.getContextValue(p.NAME[:-5])
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.year)
-        if p.NAME.endswith('.month'):
-            if p.NAME[:-6] in self.names:
-                value = self.names[p.NAME[:-6]]
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.month)
-            if self.isContextName(p.NAME[:-6]):
-                value = self.getContextValue(p.NAME[:-6])
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.month)
-        if p.NAME.endswith('.day'):
-            if p.NAME[:-4] in self.names:
-                value = self.names[p.NAME[:-4]]
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.day)
-            if self.isContextName(p.NAME[:-4]):
-                value = self.getContextValue(p.NAME[:-4])
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.day)
-        elif p.NAME.endswith('.weekday'):
-            if p.NAME[:-8] in self.names:
-                value = self.names[p.NAME[:-8]]
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.isoweekday())
-            if self.isContextName(p.NAME[:-8]):
-                value = self.getContextValue(p.NAME[:-8])
-                if isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
-                    return float(value.isoweekday())
-        elif p.NAME.endswith('.hour'):
-            if p.NAME[:-5] in self.names:
-                value = self.names[p.NAME[:-5]]
-                if isinstance(value, datetime.datetime) or isinstance(value, datetime.time):
-                    return float(value.hour)
-            if self.isContextName(p.NAME[:-5]):
-                value = self.getContextValue(p.NAME[:-5])
-                if isinstance(value, datetime.datetime) or isinstance(value, datetime.time):
-                    return float(value.hour)
-        elif p.NAME.endswith('.minute'):
-            if p.NAME[:-7] in self.names:
-                value = self.names[p.NAME[:-7]]
-                if isinstance(value, datetime.datetime) or isinstance(value, datetime.time):
-                    return float(value.minute)
-            if self.isContextName(p.NAME[:-7]):
-                value = self.getContextValue(p.NAME[:-7])
-                if isinstance(value, datetime.datetime) or isinstance(value, datetime.time):
-                    return float(value.minute)
-        elif p.NAME.endswith('.second'):
-            if p.NAME[:-7] in self.names:
-                value = self.names[p.NAME[:-7]]
-                if isinstance(value, datetime.datetime) or isinstance(value, datetime.time):
-                    return float(value.second)
-            if self.isContextName(p.NAME[:-7]):
-                value = self.getContextValue(p.NAME[:-7])
-                if isinstance(value, datetime.datetime) or isinstance(value, datetime.time):
-                    return float(value.second)
-        elif p.NAME.endswith('.timezone'):
-            isTimeZone = False
-            if p.NAME[:-9] in self.names:
-                value = self.names[p.NAME[:-9]]
-                isTimeZone = True
-            if self.isContextName(p.NAME[:-9]):
-                value = self.getContextValue(p.NAME[:-9])
-                isTimeZone = True
-            if isTimeZone:
-                if isinstance(value, datetime.datetime):
-                    if value.tzinfo is None:
-                        return None
-                    try:
-                        return str(value.tzinfo.zone)
-                    except:
-                        return str(value.tzname())
-                elif isinstance(value, datetime.time):
-                    if value.tzinfo is None:
-                        return None
-                    try:
-                        return str(value.tzinfo.zone)
-                    except:
-                        return str(value.tzname())
-        elif p.NAME.endswith('.time_offset'):
-            isTimeOffset = False
-            if p.NAME[:-12] in self.names:
-                value = self.names[p.NAME[:-12]]
-                isTimeOffset = True
-            if self.isContextName(p.NAME[:-12]):
-                value = self.getContextValue(p.NAME[:-12])
-                isTimeOffset = True
-            if isTimeOffset:
-                if isinstance(value, datetime.datetime):
-                    if value.tzinfo == None:
-                        return None
-                    return value.utcoffset()
-                elif isinstance(value, datetime.time):
-                    if value.tzinfo == None:
-                        return None
-                    tmpDateTime = datetime.datetime.combine(datetime.date.today(), value)
-                    return tmpDateTime.utcoffset()
-        elif p.NAME.endswith('.days'):
-            if p.NAME[:-5] in self.names:
-                value = self.names[p.NAME[:-5]]
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() / 60 / 60 / 24)
-            if self.isContextName(p.NAME[:-5]):
-                value = self.getContextValue(p.NAME[:-5])
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() / 60 / 60 / 24)
-        elif p.NAME.endswith('.hours'):
-            if p.NAME[:-6] in self.names:
-                value = self.names[p.NAME[:-6]]
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() / 60 / 60) % 24
-            if self.isContextName(p.NAME[:-6]):
-                value = self.getContextValue(p.NAME[:-6])
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() / 60 / 60) % 24
-        elif p.NAME.endswith('.minutes'):
-            if p.NAME[:-8] in self.names:
-                value = self.names[p.NAME[:-8]]
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() / 60) % 60
-            if self.isContextName(p.NAME[:-8]):
-                value = self.getContextValue(p.NAME[:-8])
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() / 60) % 60
-        elif p.NAME.endswith('.seconds'):
-            if p.NAME[:-8] in self.names:
-                value = self.names[p.NAME[:-8]]
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() % 60)
-            if self.isContextName(p.NAME[:-8]):
-                value = self.getContextValue(p.NAME[:-8])
-                if isinstance(value, datetime.timedelta):
-                    return float(value.total_seconds() % 60)
-        elif p.NAME.endswith('.years'):
-            if p.NAME[:-6] in self.names:
-                value = self.names[p.NAME[:-6]]
-                if type(value) == int:
-                    return float(value / 12)
-            if self.isContextName(p.NAME[:-6]):
-                value = self.getContextValue(p.NAME[:-6])
-                if type(value) == int:
-                    return float(value / 12)
-        elif p.NAME.endswith('.months'):
-            if p.NAME[:-7] in self.names:
-                value = self.names[p.NAME[:-7]]
-                if type(value) == int:
-                    return float(value % 12)
-            if self.isContextName(p.NAME[:-7]):
-                value = self.getContextValue(p.NAME[:-7])
-                if type(value) == int:
-                    return float(value % 12)
-        elif p.NAME.endswith('.start'):
-            isStart = False
-            if p.NAME[:-6] in self.names:
-                value = self.names[p.NAME[:-6]]
-                isStart = True
-            if self.isContextName(p.NAME[:-6]):
-                value = self.getContextValue(p.NAME[:-6])
-                isStart = True
-            if isStart:
-                if isinstance(value, tuple) and (len(value) == 4):
-                    (end0, low0, high1, end1) = value
-                    if low0 is None:
-                        return None
-                    try:
-                        return float(low0)
-                    except:
-                        return None
-        elif p.NAME.endswith('.start_included'):
-            isStartIncluded = False
-            if p.NAME[:-13] in self.names:
-                value = self.names[p.NAME[:-13]]
-                isStartIncluded = True
-            if self.isContextName(p.NAME[:-13]):
-                value = self.getContextValue(p.NAME[:-13])
-                isStartIncluded = True
-            if isStartIncluded:
-                if isinstance(value, tuple) and (len(value) == 4):
-                    (end0, low0, high1, end1) = value
-                    if end0 == '[':
-                        return True
-                    else:
-                        return False
-        elif p.NAME.endswith('.end'):
-            isEnd = False
-            if p.NAME[:-4] in self.names:
-                value = self.names[p.NAME[:-4]]
-                isEnd = True
-            if self.isContextName(p.NAME[:-4]):
-                value = self.getContextValue(p.NAME[:-4])
-                isEnd = True
-            if isEnd:
-                if isinstance(value, tuple) and (len(value) == 4):
-                    (end0, low0, high1, end1) = value
-                    if high1 is None:
-                        return None
-                    try:
-                        return float(high1)
-                    except:
-                        return None
-        elif p.NAME.endswith('.end_included'):
-            isEndIncluded = False
-            if p.NAME[:-11] in self.names:
-                value = self.names[p.NAME[:-11]]
-                isEndIncluded = True
-            if self.isContextName(p.NAME[:-11]):
-                value = self.getContextValue(p.NAME[:-11])
-                isEndIncluded = True
-            if isEndIncluded:
-                if isinstance(value, tuple) and (len(value) == 4):
-                    (end0, low0, high1, end1) = value
-                    if end1 == ']':
-                        return True
-                    else:
-                        return False
+        # The items of some/every, then the names, then the entries of the context literals being built
+        value = self.contextNames.getBound(p.NAME, NO_VALUE)
+        if value is not NO_VALUE:
+            return value
+        value = self.names.get(p.NAME, NO_VALUE)
+        if value is not NO_VALUE:
+            return value
+        value = self.getContextValue(p.NAME, NO_VALUE)
+        if value is not NO_VALUE:
+            return value
+        (prefix, period, suffix) = p.NAME.rpartition('.')
+        if period and (suffix in NAME_PROPERTIES):
+            (getProperty, lookup) = NAME_PROPERTIES[suffix]
+            if self.contextNames.getBound(prefix, NO_VALUE) is not NO_VALUE:
+                namesValue = NO_VALUE
+            else:
+                namesValue = self.names.get(prefix, NO_VALUE)
+            if (lookup == 'names') and (namesValue is not NO_VALUE):
+                contextValue = NO_VALUE
+            else:
+                contextValue = self.getContextValue(prefix, NO_VALUE)
+            if lookup == 'context':
+                values = (namesValue if contextValue is NO_VALUE else contextValue,)
+            else:
+                values = (namesValue, contextValue)
+            for value in values:
+                if value is not NO_VALUE:
+                    value = getProperty(value)
+                    if value is not NO_VALUE:
+                        return value
         self.errors.append(f'Undefined name {p.NAME!r}')
         return 0
 
@@ -5996,12 +6371,7 @@ class SFeelParser(Parser):
 
     def dateFunc(self, thisDate):
         ''' Convert string to datetime.date '''
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("error")
-                return dateutil.parser.parse(thisDate).date()
-        except:
-            return None
+        return _parseDate(thisDate)
 
     @_('TIME')
     def expr(self, p):
@@ -6012,11 +6382,8 @@ class SFeelParser(Parser):
     def timeFunc(self, thisTimeString):
         ''' Convert string to datetime.time '''
         parts = thisTimeString.split('@')
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("error")
-                thisTime =  dateutil.parser.parse(parts[0]).timetz()     # A time with timezone
-        except:
+        thisTime = _parseTime(parts[0])         # A time with timezone
+        if thisTime is None:
             return None
         if len(parts) == 1:
             return thisTime
@@ -6043,11 +6410,8 @@ class SFeelParser(Parser):
     def dateTimeFunc(self, thisDateTimeString):
         ''' Convert string to datetime.datetime '''
         parts = thisDateTimeString.split('@')
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("error")
-                thisDateTime = dateutil.parser.parse(parts[0])
-        except:
+        thisDateTime = _parseDateTime(parts[0])
+        if thisDateTime is None:
             return None
         if len(parts) == 1:
             return thisDateTime
@@ -6210,13 +6574,53 @@ class SFeelParser(Parser):
             For an assignment statement the 'value' will be the Python native value assigned to the named variable.
 
             For all other expressions the 'value' will be the Python native value of the S-FEEL expression.
+
+            If the parser was created with a cacheSize, then the S-FEEL text is compiled and the
+            CompiledExpression is cached (keyed on the text), so that repeated text is not lexed or parsed again.
+            The least recently used CompiledExpression is evicted when the cache is full.
         """
 
         # print("S-FEEL parsing '{!s}'".format(text))
         if (text == '') or text.isspace():
             return None
 
+        if self.cacheSize > 0:
+            with self.cacheLock:
+                compiled = self.parseCache.get(text)
+                if compiled is not None:
+                    self.cacheHits += 1
+                    self.parseCache.move_to_end(text)
+                else:
+                    self.cacheMisses += 1
+            if compiled is None:
+                compiled = self.compile(text)
+                with self.cacheLock:
+                    self.parseCache[text] = compiled
+                    while len(self.parseCache) > self.cacheSize:
+                        self.parseCache.popitem(last=False)
+                        self.cacheEvictions += 1
+            return compiled.evaluate()
+
+        # Lex, parse and evaluate in a context of their own, so that this parser can be shared by threads
+        context = self.evaluationContext()
+        (lexErrors, yaccTokens) = context.sFeelTokens(text)
+        for token in yaccTokens:
+            if token.type in ('SOME', 'EVERY'):
+                # The 'satisfies' expression is evaluated once for each item, which needs the compiled expression tree
+                return self.compile(text).evaluate()
+        retVal = context.parse(iter(yaccTokens))
+        yaccErrors = context.collectErrors()
+        status = {}
+        if (len(lexErrors) > 0) or (len(yaccErrors) > 0):
+            status['errors'] = lexErrors + yaccErrors
+        # print("S-FEEL returning '{!s}'".format(retVal))
+        return (status, retVal)
+
+    def sFeelTokens(self, text):
+        ''' Split S-FEEL text into lexer errors and the tokens to be parsed '''
         lexErrors = []
+        if self.lexer is None:
+            self.lexer = SFeelLexer()
         tokens = self.lexer.tokenize(text)
         yaccTokens = []
         for token in tokens:
@@ -6225,15 +6629,1584 @@ class SFeelParser(Parser):
                 lexErrors.append(token.value)
             else:
                 yaccTokens.append(token)
-        self.clearErrors()
-        retVal = self.parse(iter(yaccTokens))
-        yaccErrors = self.collectErrors()
+        return (lexErrors, yaccTokens)
+
+    def compile(self, text, memoSize=0):
+        """
+        Compile S-FEEL text
+
+        This routine lexes and parses the passed text once, building an expression tree
+        instead of computing the value of the S-FEEL text.
+        The returned CompiledExpression can then be evaluated many times, against different names,
+        without lexing or parsing the text again.
+
+        Args:
+            param1 (str): The S-FEEL text to be compiled
+            param2 (int): The number of results to memoize (see CompiledExpression.memoize()) - 0 means none
+
+        Returns:
+            CompiledExpression: the compiled S-FEEL text
+
+            Any lexing or parsing errors are stored in the CompiledExpression
+            and are reported in the 'status' every time it is evaluated.
+        """
+
+        if (text == '') or text.isspace():
+            return CompiledExpression(self, text, None, []).memoize(memoSize)
+
+        context = self.evaluationContext()
+        (lexErrors, yaccTokens) = context.sFeelTokens(text)
+        context._grammar = _ExprTreeGrammar.get(type(self)._grammar)      # Reductions build _ExprNodes
+        tree = context.parse(iter(yaccTokens))
+        yaccErrors = context.collectErrors()
+        return CompiledExpression(self, text, tree, lexErrors + yaccErrors).memoize(memoSize)
+
+    def evaluateMany(self, text, rows):
+        """
+        Evaluate S-FEEL text against many rows of names
+
+        This routine compiles the passed text once, then evaluates it against each row of names in turn.
+
+        Args:
+            param1 (str): The S-FEEL text to be evaluated
+            param2 (iterable): The rows - each row is a dictionary of names (variables)
+
+        Returns:
+            iterator: a (status, value) tuple for each row, in the order of the rows
+
+            'status' is a dictionary with the key 'errors' if there were any parsing errors, or errors evaluating that row.
+
+            'value' is the Python native value of the S-FEEL text for that row.
+        """
+
+        return self.compile(text).evaluateMany(rows)
+
+    def evaluateParallel(self, text, rows, workers=None, chunkSize=None):
+        """
+        Evaluate S-FEEL text against many rows of names in worker processes
+
+        This routine compiles the passed text once, then evaluates it against the rows in parallel (see CompiledExpression.evaluateParallel()).
+
+        Args:
+            param1 (str): The S-FEEL text to be evaluated
+            param2 (iterable): The rows - each row is a dictionary of names (variables)
+            param3 (int): The number of worker processes - defaults to the number of CPUs (1 evaluates the rows in this process)
+            param4 (int): The number of rows sent to a worker process at a time - defaults to PARALLEL_CHUNK_SIZE
+
+        Returns:
+            iterator: a (status, value) tuple for each row, in the order of the rows
+        """
+
+        return self.compile(text).evaluateParallel(rows, workers, chunkSize)
+
+    def evaluateColumns(self, text, columns):
+        """
+        Evaluate S-FEEL text against columns of values (requires numpy)
+
+        This routine compiles the passed text once, then evaluates it over the columns of values (see CompiledExpression.evaluateColumns()).
+
+        Args:
+            param1 (str): The S-FEEL text to be evaluated
+            param2 (dict): The names (variables) to evaluate against - each name is a numpy array (a column of values),
+                a numpy masked array (where masked values are null), or a single value.
+
+        Returns:
+            tuple: (status, values)
+
+            'status' is a dictionary with the key 'errors' if there were any parsing or evaluation errors.
+
+            'values' is a numpy masked array of the values of the S-FEEL text, one for each row, with the null values masked.
+        """
+
+        return self.compile(text).evaluateColumns(columns)
+
+
+class CompiledExpression:
+    '''
+    S-FEEL text that has been lexed and parsed into an expression tree by SFeelParser.compile()
+
+    The names the text depends on are found when it is compiled
+        freeNames (frozenset): the names it reads from the names (dotted names, such as applicant.age, as written).
+            A name property (date.year etc.) reads both the dotted name and the name (date)
+        localNames (frozenset): the names it reads that are entries of its context literals, or some/every items.
+        assignedNames (frozenset): the names it assigns (name <- expression)
+        deterministic (bool): False if it calls now() or today()
+        pure (bool): True if it is deterministic and assigns no names, so its results can be memoized
+    '''
+
+    def __init__(self, parser, text, tree, errors):
+        self.parser = parser
+        self.text = text
+        self.tree = tree
+        self.errors = errors
+        if isinstance(tree, _ExprNode):
+            self.function = tree.closure()          # The expression tree lowered to Python closures
+        else:
+            self.function = None
+        (self.freeNames, self.localNames, self.assignedNames, self.deterministic) = _dependencies(tree)
+        self.pure = self.deterministic and (len(self.assignedNames) == 0)
+        self.memoNames = tuple(sorted(self.freeNames | self.localNames))       # The names the memo is keyed on
+        self.memoToday = _usesToday(tree)      # Memo keys include today's date, as date and time conversions can depend on it
+        self.memoSize = 0
+        self.memo = OrderedDict()
+        self.memoLock = threading.Lock()
+        self.memoHits = 0
+        self.memoMisses = 0
+        self.memoEvictions = 0
+        self.memoBypassed = 0
+
+    def __reduce__(self):
+        # Expression trees hold grammar rule functions, which can't be pickled - so recompile the text when unpickling
+        return (SFeelParser.compile, (self.parser, self.text, self.memoSize))
+
+    def memoize(self, memoSize=MEMO_SIZE):
+        """
+        Memoize the results of compiled S-FEEL text
+
+        The results of the most recent memoSize evaluations are kept, keyed on the values of the names that the text reads
+        (CompiledExpression.freeNames and localNames), and returned when the text is evaluated against the same values again.
+        Text that isn't pure (it calls now() or today(), or assigns a name) is never memoized,
+        nor are evaluations against values that can't be fingerprinted (see memoInfo()['bypassed']).
+        Memoized lists and contexts are copied for each evaluation.
+
+        Args:
+            param1 (int): The number of results to keep - 0 stops memoizing (and forgets the memoized results)
+
+        Returns:
+            CompiledExpression: this CompiledExpression
+        """
+
+        with self.memoLock:
+            self.memoSize = memoSize
+            while len(self.memo) > memoSize:
+                self.memo.popitem(last=False)
+                self.memoEvictions += 1
+        return self
+
+    def memoInfo(self):
+        ''' Return the memo statistics '''
+        with self.memoLock:
+            return {'hits': self.memoHits, 'misses': self.memoMisses, 'evictions': self.memoEvictions, 'bypassed': self.memoBypassed,
+                    'size': len(self.memo), 'maxSize': self.memoSize, 'pure': self.pure}
+
+    def memoKey(self, names):
+        ''' The memo key for evaluating against these names, or None if the evaluation can't be memoized '''
+        if (self.memoSize == 0) or not self.pure:
+            return None
+        if names is None:
+            names = self.parser.names
+        try:
+            key = tuple(_fingerprint(names[name]) if name in names else None for name in self.memoNames)
+        except TypeError:
+            with self.memoLock:
+                self.memoBypassed += 1
+            return None
+        if self.memoToday:
+            key += (datetime.date.today(),)
+        return key
+
+    def evaluate(self, names=None):
+        """
+        Evaluate compiled S-FEEL text
+
+        This routine computes the value of the compiled S-FEEL text, without lexing or parsing it again.
+
+        Args:
+            param1 (dict): The names (variables) to evaluate against - defaults to the parser's names.
+                An assignment statement (name <- expression) stores the assigned value in these names.
+
+        Returns:
+            tuple: (status, value)
+
+            'status' is a dictionary with the key 'errors' if there were any parsing or evaluation errors.
+
+            'value' is the Python native value of the compiled S-FEEL text.
+        """
+
+        memoKey = self.memoKey(names)
+        if memoKey is not None:
+            with self.memoLock:
+                result = self.memo.get(memoKey)
+                if result is not None:
+                    self.memoHits += 1
+                    self.memo.move_to_end(memoKey)
+                else:
+                    self.memoMisses += 1
+            if result is not None:
+                return _copyResult(result)
+
+        context = self.parser.evaluationContext(names)
+        if self.function is not None:
+            retVal = self.function(context)
+        else:
+            retVal = self.tree
+        evalErrors = context.collectErrors()
         status = {}
-        if (len(lexErrors) > 0) or (len(yaccErrors) > 0):
-            status['errors'] = lexErrors + yaccErrors
-        # print("S-FEEL returning '{!s}'".format(retVal))
+        if (len(self.errors) > 0) or (len(evalErrors) > 0):
+            status['errors'] = self.errors + evalErrors
+
+        if memoKey is not None:
+            memoized = _copyResult((status, retVal))        # The value may be (or hold) a list or context from the names
+            with self.memoLock:
+                self.memo[memoKey] = memoized
+                while len(self.memo) > self.memoSize:
+                    self.memo.popitem(last=False)
+                    self.memoEvictions += 1
         return (status, retVal)
 
+    def evaluateMany(self, rows):
+        """
+        Evaluate compiled S-FEEL text against many rows of names
+
+        Args:
+            param1 (iterable): The rows - each row is a dictionary of names (variables)
+
+        Returns:
+            iterator: a (status, value) tuple for each row, in the order of the rows (see evaluate())
+        """
+
+        for names in rows:
+            yield self.evaluate(names)
+
+    def evaluateParallel(self, rows, workers=None, chunkSize=None):
+        """
+        Evaluate compiled S-FEEL text against many rows of names in worker processes
+
+        The compiled expression (its text) is sent to each worker process once, where it is compiled again.
+        The rows are sent in chunks and the results returned in the order of the rows.
+        Each row is all the names for its evaluation - the parser's names are not used. The rows must be picklable.
+        Assignments (name <- expression) are not returned from the workers.
+
+        Args:
+            param1 (iterable): The rows - each row is a dictionary of names (variables)
+            param2 (int): The number of worker processes - defaults to the number of CPUs (1 evaluates the rows in this process)
+            param3 (int): The number of rows sent to a worker process at a time - defaults to PARALLEL_CHUNK_SIZE
+
+        Returns:
+            iterator: a (status, value) tuple for each row, in the order of the rows (see evaluate()).
+            An exception evaluating a row is reported in the 'errors' of that row's status.
+        """
+
+        for results in _evaluateParallel([self], rows, workers, chunkSize):
+            yield results[0]
+
+    def evaluateColumns(self, columns):
+        """
+        Evaluate compiled S-FEEL text against columns of values (requires numpy)
+
+        Arithmetic, comparisons, ranges, and/or/not and the floor(), ceiling(), abs(), sqrt(), log(), exp()
+        and modulo() functions of numbers and booleans are evaluated over whole columns at once, using numpy.
+        Any other S-FEEL text is evaluated one row at a time.
+
+        Args:
+            param1 (dict): The names (variables) to evaluate against - each name is a numpy array (a column of values),
+                a numpy masked array (where masked values are null), or a single value.
+                All the columns must be the same length. NaN is null in a column of numbers.
+
+        Returns:
+            tuple: (status, values)
+
+            'status' is a dictionary with the key 'errors' if there were any parsing or evaluation errors
+            (each distinct error is only reported once).
+
+            'values' is a numpy masked array of the values of the compiled S-FEEL text, one for each row,
+            with the null values masked.
+        """
+
+        if numpy is None:
+            return ({'errors': ['evaluateColumns() requires numpy']}, None)
+        length = None
+        for (name, column) in columns.items():
+            if isinstance(column, numpy.ndarray):
+                if (column.ndim != 1) or ((length is not None) and (len(column) != length)):
+                    return ({'errors': [f'Column {name!r} is not a column of the same length as the other columns']}, None)
+                length = len(column)
+        if length is None:
+            length = 1
+        context = self.parser.evaluationContext()
+        errors = list(self.errors)
+        try:
+            columnValues = {}
+            for (name, column) in columns.items():
+                if isinstance(column, numpy.ndarray):
+                    columnValues[name] = _ColumnValue.fromColumn(column)
+                else:
+                    columnValues[name] = _ColumnValue.fromValue(column)
+            with numpy.errstate(all='ignore'):
+                if isinstance(self.tree, _ExprNode):
+                    result = _ColumnEvaluator(context, columnValues).value(self.tree)
+                else:
+                    result = _ColumnValue.fromValue(self.tree)
+            values = numpy.ma.MaskedArray(numpy.broadcast_to(result.data, (length,)).copy(),
+                                          mask=numpy.broadcast_to(result.mask, (length,)).copy())
+            for error in context.collectErrors():
+                if error not in errors:
+                    errors.append(error)
+        except _NotVectorized:
+            # Evaluate one row at a time
+            rowValues = []
+            for row in range(length):
+                names = {}
+                for (name, column) in columns.items():
+                    if not isinstance(column, numpy.ndarray):
+                        names[name] = column
+                    elif numpy.ma.is_masked(column[row]):
+                        names[name] = None
+                    else:
+                        value = column[row].item() if isinstance(column[row], numpy.generic) else column[row]
+                        if type(value) == int:          # S-FEEL numbers are floats
+                            value = float(value)
+                        elif isinstance(value, float) and math.isnan(value):
+                            value = None
+                        names[name] = value
+                (status, retVal) = self.evaluate(names)
+                for error in status.get('errors', []):
+                    if error not in errors:
+                        errors.append(error)
+                rowValues.append(retVal)
+            values = numpy.ma.MaskedArray(numpy.empty(length, dtype=object), mask=[value is None for value in rowValues])
+            values.data[:] = rowValues
+        status = {}
+        if len(errors) > 0:
+            status['errors'] = errors
+        return (status, values)
+
+
+def _sameValue(value0, value1):
+    ''' True if a name's value hasn't changed '''
+    if value0 is value1:
+        return True
+    if (value0 is NO_VALUE) or (value1 is NO_VALUE) or (type(value0) != type(value1)):
+        return False
+    try:
+        return bool(value0 == value1)
+    except Exception:
+        return False
+
+
+class EvaluationSession:
+    '''
+    Compiled S-FEEL text that is evaluated against one set of names, in the order it was added,
+    and is only re-evaluated when the names it reads change (see CompiledExpression.freeNames).
+    When re-evaluated S-FEEL text assigns a new value to a name (name <- expression), the S-FEEL text that reads that name is re-evaluated too.
+    A session is not thread safe.
+    '''
+
+    def __init__(self, parser, names=None):
+        """
+        Start a session
+
+        Args:
+            param1 (SFeelParser): The parser that compiles the S-FEEL text
+            param2 (dict): The names (variables) to evaluate against - defaults to the parser's names
+
+        Returns:
+            EvaluationSession: the session
+        """
+
+        self.parser = parser
+        self.names = parser.names if names is None else names
+        self.keys = []              # In the order they were added
+        self.positions = {}         # key: position in keys
+        self.compiled = {}          # key: CompiledExpression
+        self.values = {}            # key: (status, value) when last evaluated
+        self.readers = {}           # name: the keys of the S-FEEL text that reads name
+        self.stale = set()          # The keys that have to be re-evaluated
+        self.volatile = set()       # The keys of S-FEEL text that calls now() or today() - always re-evaluated
+
+    def add(self, text, key=None):
+        """
+        Add S-FEEL text to the session
+
+        The text is compiled, and evaluated the next time a result is asked for.
+        Adding text with the key of text already in the session replaces that text, keeping its position.
+
+        Args:
+            param1 (str): The S-FEEL text
+            param2 (hashable): The key of the text's result - defaults to the text
+
+        Returns:
+            CompiledExpression: the compiled S-FEEL text
+        """
+
+        if key is None:
+            key = text
+        compiled = self.parser.compile(text)
+        if key in self.compiled:
+            self.forget(key)
+        else:
+            self.positions[key] = len(self.keys)
+            self.keys.append(key)
+        self.compiled[key] = compiled
+        for name in compiled.freeNames | compiled.localNames:
+            self.readers.setdefault(name, set()).add(key)
+        if not compiled.deterministic:
+            self.volatile.add(key)
+        self.stale.add(key)
+        return compiled
+
+    def forget(self, key):
+        ''' Forget what the S-FEEL text with this key reads, and its result '''
+        compiled = self.compiled.pop(key)
+        for name in compiled.freeNames | compiled.localNames:
+            self.readers[name].discard(key)
+        self.volatile.discard(key)
+        self.stale.discard(key)
+        self.values.pop(key, None)
+
+    def remove(self, key):
+        """
+        Remove S-FEEL text from the session
+
+        Args:
+            param1 (hashable): The key of the text
+        """
+
+        self.forget(key)
+        self.keys.remove(key)
+        self.positions = {thisKey: position for (position, thisKey) in enumerate(self.keys)}
+
+    def set(self, name, value):
+        """
+        Set the value of a name
+
+        The S-FEEL text that reads the name is re-evaluated the next time a result is asked for - unless the value hasn't changed.
+
+        Args:
+            param1 (str): The name
+            param2 (any): The value (a Python native value, as returned by sFeelParse())
+        """
+
+        oldValue = self.names.get(name, NO_VALUE)
+        if _sameValue(oldValue, value):
+            return
+        if isinstance(oldValue, list):
+            self.parser.forgetListIndex(oldValue)
+        self.names[name] = value
+        self.changed(name)
+
+    def changed(self, name):
+        """
+        Mark the S-FEEL text that reads a name for re-evaluation
+
+        Names that are changed directly (not with set()) must be reported with changed().
+        A list that was changed in place has its list index (for list contains() and index of()) discarded.
+
+        Args:
+            param1 (str): The name
+        """
+
+        if isinstance(self.names.get(name), list):
+            self.parser.forgetListIndex(self.names[name])
+        self.stale |= self.readers.get(name, set())
+
+    def refresh(self):
+        """
+        Re-evaluate the S-FEEL text whose names have changed
+
+        Text is re-evaluated in the order it was added, so text that reads a name sees the value assigned by the text before it.
+        Text that reads a name assigned by text after it sees the new value the next time the session is refreshed,
+        just as it would if all the text was evaluated again, in order, every time.
+
+        Returns:
+            list: the keys of the S-FEEL text that was re-evaluated
+        """
+
+        self.stale |= self.volatile
+        pending = [self.positions[key] for key in self.stale]
+        heapq.heapify(pending)
+        self.stale = set()
+        evaluated = []
+        done = set()
+        while pending:
+            position = heapq.heappop(pending)
+            key = self.keys[position]
+            if key in done:
+                continue
+            done.add(key)
+            compiled = self.compiled[key]
+            oldValues = [(name, self.names.get(name, NO_VALUE)) for name in compiled.assignedNames]
+            self.values[key] = compiled.evaluate(self.names)
+            evaluated.append(key)
+            for (name, oldValue) in oldValues:
+                if _sameValue(oldValue, self.names.get(name, NO_VALUE)):
+                    continue
+                for reader in self.readers.get(name, ()):
+                    if self.positions[reader] > position:
+                        heapq.heappush(pending, self.positions[reader])
+                    else:
+                        self.stale.add(reader)
+        return evaluated
+
+    def result(self, key):
+        """
+        The result of S-FEEL text in the session
+
+        Args:
+            param1 (hashable): The key of the text
+
+        Returns:
+            tuple: (status, value) - as returned by CompiledExpression.evaluate()
+        """
+
+        self.refresh()
+        return self.values[key]
+
+    def results(self):
+        """
+        The results of all the S-FEEL text in the session
+
+        Returns:
+            dict: the (status, value) of each key, in the order the text was added
+        """
+
+        self.refresh()
+        return {key: self.values[key] for key in self.keys}
+
+
+class _ExprNode:
+    '''
+    A grammar rule reduction, deferred until evaluation time.
+    The children are the tokens and the _ExprNodes of the symbols on the right hand side of the rule
+    '''
+    __slots__ = ('production', 'children', 'constant')
+
+    def __init__(self, production, children):
+        self.production = production
+        self.children = children
+        self.constant = False           # True if the value can't change (see _ExprTreeProduction.func())
+
+    def evaluate(self, parser):
+        # Evaluate the children, left to right, then call the grammar rule function - the same order as parse()
+        thisSlice = []
+        for child in self.children:
+            if isinstance(child, _ExprNode):
+                thisSlice.append(_ExprValue(child.evaluate(parser)))
+            else:
+                thisSlice.append(child)
+        return self.reduce(parser, thisSlice)
+
+    def reduce(self, parser, thisSlice):
+        p = YaccProduction(thisSlice)
+        p._namemap = self.production.namemap
+        return self.production.func(parser, p)
+
+    def closure(self):
+        '''
+        Lower this node to a Python closure, evaluate(parser), which returns the same value as self.evaluate(parser).
+        The closures of the children are bound when the closure is built, so evaluating it doesn't walk the tree,
+        and the hottest grammar rules (see CLOSURE_RULES) call their runtime helpers (_add(), _equals() etc.) directly
+        '''
+        lower = CLOSURE_RULES.get(_productionKey(self.production))
+        if lower is not None:
+            return lower(self)
+        return self.ruleClosure()
+
+    def ruleClosure(self):
+        ''' A closure that calls the grammar rule function with the values of the children '''
+        func = self.production.func
+        namemap = self.production.namemap
+        parts = tuple((child.closure(), True) if isinstance(child, _ExprNode) else (child, False) for child in self.children)
+
+        def evaluate(parser):
+            p = YaccProduction([_ExprValue(part(parser)) if isNode else part for (part, isNode) in parts])
+            p._namemap = namemap
+            return func(parser, p)
+        return evaluate
+
+class _SpineNode(_ExprNode):
+    '''
+    A left recursive grammar rule (listPart -> listPart COMMA expr, expr -> expr PLUS expr etc.).
+    The reductions down the left spine are evaluated in a loop, rather than recursively, as long lists are deep trees
+    '''
+    __slots__ = ()
+
+    def evaluate(self, parser):
+        spine = [self]
+        node = self.children[0]
+        while isinstance(node, _SpineNode):
+            spine.append(node)
+            node = node.children[0]
+        value = node.evaluate(parser)
+        for node in reversed(spine):
+            thisSlice = [_ExprValue(value)]
+            for child in node.children[1:]:
+                if isinstance(child, _ExprNode):
+                    thisSlice.append(_ExprValue(child.evaluate(parser)))
+                else:
+                    thisSlice.append(child)
+            value = node.reduce(parser, thisSlice)
+        return value
+
+    def closure(self):
+        spine = [self]
+        node = self.children[0]
+        while isinstance(node, _SpineNode):
+            spine.append(node)
+            node = node.children[0]
+        first = node.closure()
+        if len(spine) == 1:
+            helper = BINARY_HELPERS.get(_productionKey(self.production))
+            if helper is not None:
+                second = self.children[-1].closure()
+                return lambda parser: helper(first(parser), second(parser))
+        steps = tuple(node.stepClosure() for node in reversed(spine))
+
+        def evaluate(parser):
+            value = first(parser)
+            for step in steps:
+                value = step(parser, value)
+            return value
+        return evaluate
+
+    def stepClosure(self):
+        ''' A closure, step(parser, left), that reduces this rule given the value of its left recursive child '''
+        helper = BINARY_HELPERS.get(_productionKey(self.production))
+        if helper is not None:
+            second = self.children[-1].closure()
+            return lambda parser, left: helper(left, second(parser))
+        func = self.production.func
+        namemap = self.production.namemap
+        parts = tuple((child.closure(), True) if isinstance(child, _ExprNode) else (child, False) for child in self.children[1:])
+
+        def step(parser, left):
+            p = YaccProduction([_ExprValue(left)] + [_ExprValue(part(parser)) if isNode else part for (part, isNode) in parts])
+            p._namemap = namemap
+            return func(parser, p)
+        return step
+
+
+class _AndNode(_ExprNode):
+    '''
+    expr AND expr, which doesn't evaluate the right hand expr if the left hand expr is false.
+    In FEEL three-valued logic false and anything is false.
+    '''
+    __slots__ = ()
+
+    def evaluate(self, parser):
+        left = self.children[0].evaluate(parser)
+        if left is False:
+            return False
+        return self.reduce(parser, [_ExprValue(left), _ExprValue(self.children[1].evaluate(parser))])
+
+    def closure(self):
+        first = self.children[0].closure()
+        second = self.children[1].closure()
+
+        def evaluate(parser):
+            left = first(parser)
+            if left is False:
+                return False
+            return _and(left, second(parser))
+        return evaluate
+
+
+class _OrNode(_ExprNode):
+    '''
+    expr OR expr, which doesn't evaluate the right hand expr if the left hand expr is true.
+    In FEEL three-valued logic true or anything is true.
+    '''
+    __slots__ = ()
+
+    def evaluate(self, parser):
+        left = self.children[0].evaluate(parser)
+        if left is True:
+            return True
+        return self.reduce(parser, [_ExprValue(left), self.children[1], _ExprValue(self.children[2].evaluate(parser))])
+
+    def closure(self):
+        first = self.children[0].closure()
+        second = self.children[2].closure()
+
+        def evaluate(parser):
+            left = first(parser)
+            if left is True:
+                return True
+            return _or(left, second(parser))
+        return evaluate
+
+
+class _QuantifiedNode(_ExprNode):
+    '''
+    SOME/EVERY NAME IN expr SATISFIES expr - the satisfies expr is evaluated once for each item in the list,
+    with NAME bound to the item (and NAME.key bound to each value, if the item is a dictionary)
+    '''
+    __slots__ = ()
+
+    def items(self, parser):
+        ''' Return the list, or None if the IN expr is not a list '''
+        thisList = self.children[3].evaluate(parser)
+        if not isinstance(thisList, list):
+            return None
+        return thisList
+
+    def satisfies(self, parser, item):
+        name = self.children[1].value
+        itemNames = {name:item}
+        if isinstance(item, dict):
+            for key in item:
+                itemNames[name + '.' + key] = item[key]
+        parser.contextNames.push(itemNames, bound=True)
+        parser.inContext += 1
+        try:
+            return self.children[5].evaluate(parser)
+        finally:
+            parser.contextNames.pop()
+            parser.inContext -= 1
+
+    def closure(self):
+        items = self.children[3].closure()
+        name = self.children[1].value
+        satisfies = self.children[5].closure()
+        decides = self.decides
+
+        def evaluate(parser):
+            thisList = items(parser)
+            if not isinstance(thisList, list):
+                return None
+            for item in thisList:
+                itemNames = {name:item}
+                if isinstance(item, dict):
+                    for key in item:
+                        itemNames[name + '.' + key] = item[key]
+                parser.contextNames.push(itemNames, bound=True)
+                parser.inContext += 1
+                try:
+                    if (satisfies(parser) is True) is decides:
+                        return decides
+                finally:
+                    parser.contextNames.pop()
+                    parser.inContext -= 1
+            return not decides
+        return evaluate
+
+
+class _SomeNode(_QuantifiedNode):
+    ''' True as soon as the satisfies expr is true for an item, otherwise False '''
+    __slots__ = ()
+    decides = True          # The value that stops the search
+
+    def evaluate(self, parser):
+        thisList = self.items(parser)
+        if thisList is None:
+            return None
+        for item in thisList:
+            if self.satisfies(parser, item) is True:
+                return True
+        return False
+
+
+class _EveryNode(_QuantifiedNode):
+    ''' False as soon as the satisfies expr is not true for an item, otherwise True '''
+    __slots__ = ()
+    decides = False         # The value that stops the search
+
+    def evaluate(self, parser):
+        thisList = self.items(parser)
+        if thisList is None:
+            return None
+        for item in thisList:
+            if self.satisfies(parser, item) is not True:
+                return False
+        return True
+
+def _productionKey(production):
+    ''' The grammar rule of a Production, as text (without any %prec) '''
+    return f'{production.name} -> {" ".join(production.prod)}'
+
+
+# The grammar rules of literals (and lists of literals), whose value is always the same
+LITERAL_PRODUCTIONS = frozenset(['expr -> NUMBER', 'expr -> STRING', 'expr -> BOOLEAN', 'expr -> NULL', 'expr -> MINUS expr',
+                                 'expr -> DATE', 'expr -> TIME', 'expr -> DATETIME', 'expr -> DTDURATION', 'expr -> YMDURATION', 'expr -> ATSTRING',
+                                 'expr -> listStart RBRACKET', 'expr -> listStart listPart RBRACKET', 'listStart -> LBRACKET expr',
+                                 'listPart -> COMMA expr', 'listPart -> listPart COMMA expr'])
+
+# The types of the list items that can be tested for membership by hashing
+HASHED_TYPES = (str, float, int, bool, type(None), datetime.date, datetime.time, datetime.timedelta)
+
+
+def _isLiteral(node):
+    ''' True if an _ExprNode is a literal, or a list of literals '''
+    nodes = [node]          # Not recursive, as long lists are deep trees
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, _ConstantNode):
+            continue
+        if _productionKey(node.production) not in LITERAL_PRODUCTIONS:
+            return False
+        nodes += [child for child in node.children if isinstance(child, _ExprNode)]
+    return True
+
+
+# The grammar rules of context literals, whose entries can be used in the entries that follow them
+CONTEXT_PRODUCTIONS = frozenset(['expr -> contextStart RCURLY', 'expr -> contextStart COMMA contextPart RCURLY'])
+
+# The grammar rules whose value depends on when they are evaluated
+NONDETERMINISTIC_PRODUCTIONS = frozenset(['expr -> NOWFUNC RPAREN', 'expr -> TODAYFUNC RPAREN'])
+
+
+def _contextKeys(node):
+    ''' The keys of the entries of a context literal (but not of the contexts nested in it) '''
+    keys = set()
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        for child in node.children:
+            if isinstance(child, _ExprNode):
+                if child.production.name in ('contextStart', 'contextPart'):
+                    nodes.append(child)
+            elif child.type in ('NAME', 'ITEM'):
+                keys.add(child.value)
+            elif child.type == 'STRING':
+                keys.add(child.value[1:-1])
+    return keys
+
+
+def _dependencies(tree):
+    '''
+    The names an expression tree reads and assigns, and whether it calls now() or today()
+    Returns a tuple (freeNames, localNames, assignedNames, deterministic) - see CompiledExpression
+    '''
+    freeNames = set()
+    localNames = set()
+    assignedNames = set()
+    deterministic = True
+    nodes = [(tree, frozenset())] if isinstance(tree, _ExprNode) else []
+    while nodes:            # Not recursive, as long lists are deep trees
+        (node, bound) = nodes.pop()
+        if isinstance(node, _ConstantNode):
+            continue
+        key = _productionKey(node.production)
+        if key == 'expr -> NAME':
+            name = node.children[0].value
+            reads = [name]
+            (prefix, period, suffix) = name.rpartition('.')
+            if period and (suffix in NAME_PROPERTIES):          # A name property - name.year etc.
+                reads.append(prefix)
+            for read in reads:
+                if (read in bound) or (read.partition('.')[0] in bound):
+                    localNames.add(read)
+                else:
+                    freeNames.add(read)
+            continue
+        if key == 'statement -> NAME ASSIGN expr':
+            assignedNames.add(node.children[0].value)
+        elif key in NONDETERMINISTIC_PRODUCTIONS:
+            deterministic = False
+        if isinstance(node, _QuantifiedNode):       # NAME is bound to each item in the satisfies expr
+            nodes.append((node.children[3], bound))
+            nodes.append((node.children[5], bound | {node.children[1].value}))
+            continue
+        if key in CONTEXT_PRODUCTIONS:
+            bound = bound | _contextKeys(node)
+        nodes += [(child, bound) for child in node.children if isinstance(child, _ExprNode)]
+    return (frozenset(freeNames), frozenset(localNames), frozenset(assignedNames), deterministic)
+
+
+def _usesToday(tree):
+    '''
+    True if an expression tree has date(), time() or date and time() conversions that weren't folded (dateutil takes missing parts from today's date),
+    or named time zones (whose UTC offset is for today's date)
+    '''
+    nodes = [tree] if isinstance(tree, _ExprNode) else []
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, _ConstantNode):
+            continue
+        if not DATE_CONVERSIONS.isdisjoint(node.production.prod):
+            return True
+        for child in node.children:
+            if isinstance(child, _ExprNode):
+                nodes.append(child)
+            elif isinstance(child.value, str) and TIME_ZONE_NAME.search(child.value):
+                return True
+    return False
+
+
+class _InNode(_ExprNode):
+    '''
+    A membership test of a list of literals (expr IN [1, 2, 3] or expr in (1, 2, 3)) which, if they are all scalars (not ranges, lists or contexts),
+    is a lookup in a frozenset of the literals, built the first time the test is evaluated
+    '''
+    __slots__ = ('members',)
+
+    def __init__(self, production, children):
+        super().__init__(production, children)
+        self.members = NO_VALUE         # Not yet known
+
+    def literals(self, parser):
+        ''' The list of literals, or None if it isn't a list of literals '''
+        return None
+
+    def getMembers(self, parser):
+        ''' The literals as a frozenset, or None if membership can't be tested by hashing '''
+        if self.members is NO_VALUE:
+            members = None
+            knownErrors = len(parser.errors)
+            literals = self.literals(parser)
+            if len(parser.errors) > knownErrors:
+                del parser.errors[knownErrors:]         # Reported when the test is evaluated in full
+            elif (literals is not None) and all(isinstance(item, HASHED_TYPES) for item in literals):
+                members = frozenset(literals)
+            self.members = members
+        return self.members
+
+    def evaluate(self, parser):
+        members = self.getMembers(parser)
+        if members is None:
+            return super().evaluate(parser)
+        value = self.value(parser)
+        try:
+            return value in members
+        except TypeError:           # Lists and contexts are never equal to a scalar
+            return False
+
+    def closure(self):
+        value = self.valueClosure()
+        fallback = self.fallbackClosure()
+
+        def evaluate(parser):
+            members = self.members
+            if members is NO_VALUE:
+                members = self.getMembers(parser)
+            if members is None:
+                return fallback(parser)
+            try:
+                return value(parser) in members
+            except TypeError:
+                return False
+        return evaluate
+
+
+class _InListNode(_InNode):
+    ''' expr IN [literal, literal, ...] '''
+    __slots__ = ()
+
+    def literals(self, parser):
+        if (not isinstance(self.children[2], _ExprNode)) or (not _isLiteral(self.children[2])):
+            return None
+        literals = self.children[2].evaluate(parser)
+        if not isinstance(literals, list):
+            return None
+        return literals
+
+    def value(self, parser):
+        return self.children[0].evaluate(parser)
+
+    def valueClosure(self):
+        return self.children[0].closure()
+
+    def fallbackClosure(self):
+        first = self.children[0].closure()
+        second = self.children[2].closure()
+        return lambda parser: _isIn(first(parser), second(parser))
+
+
+class _InTestsNode(_InNode):
+    ''' expr in (literal, literal, ...) - the in() function with equality tests '''
+    __slots__ = ()
+
+    def literals(self, parser):
+        inStart = self.children[0]
+        if _productionKey(inStart.production) != 'inStart -> expr INFUNC expr':
+            return None
+        if (not _isLiteral(inStart.children[2])) or (not _isLiteral(self.children[1])):
+            return None
+        first = inStart.children[2].evaluate(parser)
+        if isinstance(first, list):
+            return None
+        return [first] + self.children[1].evaluate(parser)
+
+    def value(self, parser):
+        return self.children[0].children[0].evaluate(parser)
+
+    def valueClosure(self):
+        return self.children[0].children[0].closure()
+
+    def fallbackClosure(self):
+        return self.ruleClosure()
+
+
+def _isImmutable(value):
+    ''' True if value (a scalar, or a range of scalars) can't be changed '''
+    if isinstance(value, tuple):
+        return all(_isImmutable(item) for item in value)
+    return isinstance(value, HASHED_TYPES)
+
+
+def _constantCopy(value):
+    ''' How to copy a folded constant for each evaluation - None if it can't be changed (so needn't be copied) '''
+    if _isImmutable(value):
+        return None
+    if isinstance(value, list) and all(_isImmutable(item) for item in value):
+        return list
+    if isinstance(value, dict) and all(_isImmutable(item) for item in value.values()):
+        return dict
+    return copy.deepcopy
+
+
+class _ConstantNode(_ExprNode):
+    '''
+    An expr with no names, now() or today() in it, which was evaluated once, when it was compiled (constant folding).
+    Folded lists and contexts are copied for each evaluation, as callers (and assignments) may change them
+    '''
+    __slots__ = ('value', 'copy')
+
+    def __init__(self, production, children, value):
+        super().__init__(production, children)
+        self.constant = True
+        self.value = value
+        self.copy = _constantCopy(value)
+
+    def evaluate(self, parser):
+        if self.copy is None:
+            return self.value
+        return self.copy(self.value)
+
+    def closure(self):
+        value = self.value
+        thisCopy = self.copy
+        if thisCopy is None:
+            return lambda parser: value
+        return lambda parser: thisCopy(value)
+
+
+# The grammar rules that are never folded - names (and assignment to names) and the current date and time
+UNFOLDED_PRODUCTIONS = frozenset(['expr -> NAME', 'statement -> NAME ASSIGN expr', 'expr -> NOWFUNC RPAREN', 'expr -> TODAYFUNC RPAREN'])
+
+# date(), time() and date and time() fall back to dateutil, which takes any missing parts from today's date,
+# so they are only folded if their arguments are already dates, times or numbers, or are strict ISO 8601 strings
+DATE_CONVERSIONS = frozenset(['DATEFUNC', 'TIMEFUNC', 'DATEANDTIMEFUNC'])
+
+# Named time zones (@Europe/Paris) are converted to a UTC offset for today's date, so times in them are never folded
+TIME_ZONE_NAME = re.compile(r'@[A-Za-z0-9_-]+/[A-Za-z0-9_-]+')
+
+
+def _isFoldedDateArgument(node):
+    ''' True if node is a folded date(), time() or date and time() argument that doesn't depend on today's date '''
+    if not isinstance(node, _ConstantNode):
+        return False
+    if not isinstance(node.value, str):
+        return True
+    return (_isoDate(node.value) is not None) or (_isoTime(node.value) is not None) or (_isoDateTime(node.value) is not None)
+
+
+class _ExprValue:
+    ''' The value of an evaluated child, in the form expected by YaccProduction '''
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _nameClosure(node):
+    '''
+    A name, looked up in the items of some/every and then the names first -
+    the grammar rule looks in the context names, and for name properties, if it isn't there
+    '''
+    name = node.children[0].value
+    lookup = node.ruleClosure()
+
+    def evaluate(parser):
+        value = parser.contextNames.getBound(name, NO_VALUE)
+        if value is not NO_VALUE:
+            return value
+        value = parser.names.get(name, NO_VALUE)
+        if value is not NO_VALUE:
+            return value
+        return lookup(parser)
+    return evaluate
+
+
+def _passThroughClosure(node):
+    ''' (expr), statement -> expr etc. - the value of the only child expression '''
+    return [child for child in node.children if isinstance(child, _ExprNode)][0].closure()
+
+
+def _negateClosure(node):
+    operand = node.children[1].closure()
+    return lambda parser: _negate(operand(parser))
+
+
+def _notClosure(node):
+    operand = node.children[1].closure()
+
+    def evaluate(parser):
+        value = operand(parser)
+        if isinstance(value, bool):
+            return not value
+        return None
+    return evaluate
+
+
+def _rangeClosure(end0, index, end1):
+    ''' ltrange and gtrange - a range with one endpoint, the value of the expr '''
+    def lower(node):
+        endpoint = node.children[1].closure()
+        if index == 1:
+            return lambda parser: Range(end0, endpoint(parser), None, end1)
+        return lambda parser: Range(end0, None, endpoint(parser), end1)
+    return lower
+
+
+# The left recursive grammar rules (see _SpineNode) whose closures call a runtime helper with the values of the first and last children
+BINARY_HELPERS = {
+    'expr -> expr PLUS expr': _add,
+    'expr -> expr MINUS expr': _subtract,
+    'expr -> expr EXPONENT expr': _power,
+    'expr -> expr MULTIPY expr': _multiply,
+    'expr -> expr DIVIDE expr': _divide,
+    'expr -> expr EQUALS expr': _equals,
+    'expr -> expr NOTEQUALS expr': _notEquals,
+    'expr -> expr ltrange': _below,
+    'expr -> expr gtrange': _above,
+    'expr -> expr IN ltrange': _isIn,
+    'expr -> expr IN gtrange': _isIn,
+}
+
+# The other grammar rules that are lowered to their own closures (the rest call their grammar rule function)
+CLOSURE_RULES = {
+    'expr -> NAME': _nameClosure,
+    'statement -> expr': _passThroughClosure,
+    'expr -> LPAREN expr RPAREN': _passThroughClosure,
+    'expr -> LPAREN ltrange RPAREN': _passThroughClosure,
+    'expr -> LPAREN gtrange RPAREN': _passThroughClosure,
+    'expr -> MINUS expr': _negateClosure,
+    'expr -> NOT expr': _notClosure,
+    'ltrange -> LTTHAN expr': _rangeClosure('(', 2, ')'),
+    'ltrange -> LTTHANEQUAL expr': _rangeClosure('(', 2, ']'),
+    'gtrange -> GTTHAN expr': _rangeClosure('(', 1, ')'),
+    'gtrange -> GTTHANEQUAL expr': _rangeClosure('[', 1, ')'),
+}
+
+
+class _ExprTreeProduction:
+    '''
+    A stand in for a grammar Production, whose reduction builds an _ExprNode instead of computing a value.
+    An expr whose children can't change (no names, now() or today()) is evaluated as it is built, and becomes a _ConstantNode
+    '''
+    __slots__ = ('name', 'len', 'namemap', 'production', 'nodeClass', 'foldable', 'convertsDates')
+
+    # The grammar rules that have their own way of evaluating their _ExprNodes
+    nodeClasses = {
+        'expr -> expr andExpr': _AndNode,
+        'expr -> expr OR expr': _OrNode,
+        'expr -> SOME NAME IN expr SATISFIES expr': _SomeNode,
+        'expr -> EVERY NAME IN expr SATISFIES expr': _EveryNode,
+        'expr -> expr IN expr': _InListNode,
+        'expr -> inStart listPart RPAREN': _InTestsNode,
+    }
+
+    def __init__(self, production):
+        self.name = production.name
+        self.len = production.len
+        self.namemap = production.namemap
+        self.production = production
+        self.nodeClass = self.nodeClasses.get(_productionKey(production))
+        if self.nodeClass is None:
+            if (len(production.prod) > 1) and (production.prod[0] == production.name):
+                self.nodeClass = _SpineNode
+            else:
+                self.nodeClass = _ExprNode
+        self.foldable = _productionKey(production) not in UNFOLDED_PRODUCTIONS
+        self.convertsDates = not DATE_CONVERSIONS.isdisjoint(production.prod)
+
+    def func(self, parser, p):
+        children = []
+        constant = self.foldable
+        for sym in p._slice:
+            if isinstance(sym.value, _ExprNode):
+                children.append(sym.value)
+                constant = constant and sym.value.constant
+            else:
+                children.append(sym)
+                constant = constant and not (isinstance(sym.value, str) and TIME_ZONE_NAME.search(sym.value))
+        if constant and self.convertsDates:
+            constant = all(_isFoldedDateArgument(child) for child in children if isinstance(child, _ExprNode))
+        node = self.nodeClass(self.production, children)
+        if constant and (self.name == 'expr'):
+            folded = self.fold(parser, node)
+            if folded is not None:
+                return folded
+            constant = False
+        node.constant = constant
+        return node
+
+    def fold(self, parser, node):
+        ''' Evaluate an expr that can't change, returning it as a _ConstantNode - or None if it had errors '''
+        context = parser.evaluationContext({})
+        try:
+            value = node.evaluate(context)
+        except Exception:
+            return None
+        if len(context.errors) > 0:
+            return None
+        return _ConstantNode(node.production, node.children, value)
+
+
+class _ExprTreeGrammar:
+    ''' The grammar Productions as _ExprTreeProductions - built once per grammar '''
+    grammars = {}
+
+    def __init__(self, grammar):
+        self.Productions = [_ExprTreeProduction(production) for production in grammar.Productions]
+
+    @classmethod
+    def get(cls, grammar):
+        if id(grammar) not in cls.grammars:
+            cls.grammars[id(grammar)] = cls(grammar)
+        return cls.grammars[id(grammar)]
+
+
+class _NotVectorized(Exception):
+    ''' Raised when a compiled expression tree can't be evaluated over columns with numpy '''
+
+
+class _ColumnValue:
+    '''
+    A column of S-FEEL values (or a single value, which numpy broadcasts against the columns).
+    kind is 'number', 'boolean' or 'null' - mask is True where the value is null
+    '''
+    __slots__ = ('kind', 'data', 'mask')
+
+    def __init__(self, kind, data, mask):
+        self.kind = kind
+        self.data = data
+        self.mask = mask
+
+    @classmethod
+    def fromValue(cls, value):
+        ''' A single Python native value as a _ColumnValue '''
+        if value is None:
+            return cls('null', numpy.float64(0.0), numpy.True_)
+        if isinstance(value, bool):
+            return cls('boolean', numpy.bool_(value), numpy.False_)
+        if isinstance(value, float):
+            return cls('number', numpy.float64(value), numpy.False_)
+        raise _NotVectorized(value)
+
+    @classmethod
+    def fromColumn(cls, column):
+        ''' A numpy array (or masked array) as a _ColumnValue '''
+        data = numpy.ma.getdata(column)
+        mask = numpy.ma.getmaskarray(column)
+        if data.dtype == numpy.bool_:
+            return cls('boolean', data, mask)
+        if numpy.issubdtype(data.dtype, numpy.integer) or numpy.issubdtype(data.dtype, numpy.floating):
+            data = data.astype(numpy.float64)
+            return cls('number', data, mask | numpy.isnan(data))
+        raise _NotVectorized(column)
+
+    def isBoolean(self):
+        ''' True where the value is a boolean (not null) '''
+        if self.kind == 'boolean':
+            return ~self.mask
+        return numpy.False_
+
+    def isNumber(self):
+        ''' True where the value is a number (not null) '''
+        if self.kind == 'number':
+            return ~self.mask
+        return numpy.False_
+
+    def isTrue(self):
+        ''' True where the value is the boolean true '''
+        if self.kind == 'boolean':
+            return ~self.mask & self.data
+        return numpy.False_
+
+    def isFalse(self):
+        ''' True where the value is the boolean false '''
+        if self.kind == 'boolean':
+            return ~self.mask & ~self.data
+        return numpy.False_
+
+
+class _ColumnRange:
+    ''' A range (end0, lowVal, highVal, end1) whose lowVal and highVal are _ColumnValues (or None) '''
+    __slots__ = ('end0', 'lowVal', 'highVal', 'end1')
+
+    def __init__(self, end0, lowVal, highVal, end1):
+        self.end0 = end0
+        self.lowVal = lowVal
+        self.highVal = highVal
+        self.end1 = end1
+
+
+class _ColumnEvaluator:
+    '''
+    Evaluates a compiled expression tree over columns of values, using numpy,
+    following the same FEEL null semantics as the grammar rules.
+    Only the grammar rules in 'rules' can be evaluated this way - any other rule raises _NotVectorized,
+    unless it has no names in it, in which case it is evaluated once, as a single value.
+    '''
+
+    rules = {
+        'statement -> expr': 'passThrough',
+        'expr -> LPAREN expr RPAREN': 'passThrough',
+        'expr -> LPAREN ltrange RPAREN': 'passThrough',
+        'expr -> LPAREN gtrange RPAREN': 'passThrough',
+        'expr -> NAME': 'name',
+        'expr -> expr PLUS expr': 'arithmetic',
+        'expr -> expr MINUS expr': 'arithmetic',
+        'expr -> expr MULTIPY expr': 'arithmetic',
+        'expr -> expr DIVIDE expr': 'arithmetic',
+        'expr -> expr EXPONENT expr': 'arithmetic',
+        'expr -> MINUS expr': 'negate',
+        'expr -> expr EQUALS expr': 'equals',
+        'expr -> expr NOTEQUALS expr': 'equals',
+        'expr -> expr ltrange': 'compare',
+        'expr -> expr gtrange': 'compare',
+        'ltrange -> LTTHAN expr': 'ltrange',
+        'ltrange -> LTTHANEQUAL expr': 'ltrange',
+        'gtrange -> GTTHAN expr': 'gtrange',
+        'gtrange -> GTTHANEQUAL expr': 'gtrange',
+        'expr -> LPAREN expr ELLIPSE expr RPAREN': 'range',
+        'expr -> LPAREN expr ELLIPSE expr RBRACKET': 'range',
+        'expr -> LPAREN expr ELLIPSE expr LBRACKET': 'range',
+        'expr -> RBRACKET expr ELLIPSE expr RPAREN': 'range',
+        'expr -> RBRACKET expr ELLIPSE expr RBRACKET': 'range',
+        'expr -> RBRACKET expr ELLIPSE expr LBRACKET': 'range',
+        'expr -> listStart ELLIPSE expr RPAREN': 'listStartRange',
+        'expr -> listStart ELLIPSE expr RBRACKET': 'listStartRange',
+        'expr -> listStart ELLIPSE expr LBRACKET': 'listStartRange',
+        'expr -> expr IN expr': 'inRange',
+        'expr -> expr IN ltrange': 'inRange',
+        'expr -> expr IN gtrange': 'inRange',
+        'expr -> betweenExpr andExpr': 'between',
+        'expr -> expr andExpr': 'andOr',
+        'expr -> expr OR expr': 'andOr',
+        'expr -> NOT expr': 'notFunc',
+        'expr -> NOTFUNC expr RPAREN': 'notFunc',
+        'expr -> FLOORFUNC expr RPAREN': 'mathFunc',
+        'expr -> CEILINGFUNC expr RPAREN': 'mathFunc',
+        'expr -> ABSFUNC expr RPAREN': 'mathFunc',
+        'expr -> SQRTFUNC expr RPAREN': 'mathFunc',
+        'expr -> LOGFUNC expr RPAREN': 'mathFunc',
+        'expr -> EXPFUNC expr RPAREN': 'mathFunc',
+        'expr -> MODULOFUNC expr COMMA expr RPAREN': 'modulo',
+    }
+
+    mathFuncs = {
+        'FLOORFUNC': 'floor',
+        'CEILINGFUNC': 'ceil',
+        'ABSFUNC': 'absolute',
+        'SQRTFUNC': 'sqrt',
+        'LOGFUNC': 'log',
+        'EXPFUNC': 'exp',
+    }
+
+    def __init__(self, parser, columns):
+        self.parser = parser
+        self.columns = columns
+
+    def evaluate(self, node):
+        ''' Evaluate an _ExprNode (or a child token) returning a _ColumnValue or a _ColumnRange '''
+        production = node.production
+        if isinstance(node, _ConstantNode) and ((node.value is None) or isinstance(node.value, (bool, float))):
+            return _ColumnValue.fromValue(node.value)
+        rule = self.rules.get(_productionKey(production))
+        if rule is not None:
+            return getattr(self, rule)(node)
+        if not self.isConstant(node):
+            raise _NotVectorized(production)
+        return _ColumnValue.fromValue(node.evaluate(self.parser))
+
+    def isConstant(self, node):
+        ''' True if there are no names in this expression tree '''
+        for child in node.children:
+            if isinstance(child, _ExprNode):
+                if not self.isConstant(child):
+                    return False
+            elif child.type == 'NAME':
+                return False
+        return True
+
+    def value(self, node):
+        ''' Evaluate an _ExprNode that must be a value, not a range '''
+        thisValue = self.evaluate(node)
+        if not isinstance(thisValue, _ColumnValue):
+            raise _NotVectorized(node.production)
+        return thisValue
+
+    def passThrough(self, node):
+        if len(node.children) == 1:
+            return self.evaluate(node.children[0])
+        return self.evaluate(node.children[1])
+
+    def name(self, node):
+        name = node.children[0].value
+        if name not in self.columns:
+            raise _NotVectorized(name)
+        return self.columns[name]
+
+    def arithmetic(self, node):
+        x0 = self.value(node.children[0])
+        x1 = self.value(node.children[2])
+        if (x0.kind != 'number') or (x1.kind != 'number'):
+            return _ColumnValue.fromValue(None)
+        operator = node.children[1].type
+        mask = x0.mask | x1.mask
+        if operator == 'PLUS':
+            data = x0.data + x1.data
+        elif operator == 'MINUS':
+            data = x0.data - x1.data
+        elif operator == 'MULTIPY':
+            data = x0.data * x1.data
+        elif operator == 'DIVIDE':
+            mask = mask | (x1.data == 0)
+            data = x0.data / numpy.where(x1.data == 0, 1.0, x1.data)
+        else:
+            with numpy.errstate(all='ignore'):
+                data = numpy.power(x0.data, x1.data)
+            if numpy.any(~numpy.isfinite(data) & ~mask):
+                # A negative number to a fractional power is complex, and overflows raise OverflowError, one row at a time
+                raise _NotVectorized(operator)
+        return _ColumnValue('number', data, mask | numpy.isnan(data))
+
+    def negate(self, node):
+        x = self.value(node.children[1])
+        if x.kind == 'number':
+            return _ColumnValue('number', -x.data, x.mask)
+        if x.kind == 'boolean':         # The grammar rule negates booleans
+            return _ColumnValue('boolean', ~x.data, x.mask)
+        return _ColumnValue.fromValue(None)
+
+    def equals(self, node):
+        x0 = self.value(node.children[0])
+        x1 = self.value(node.children[2])
+        isEquals = (node.children[1].type == 'EQUALS')
+        bothNull = x0.mask & x1.mask
+        oneNull = x0.mask ^ x1.mask
+        if x0.kind == x1.kind:
+            same = (x0.data == x1.data)
+            mask = numpy.False_
+        else:                           # Different data types are null, unless one (or both) is null
+            same = numpy.False_
+            mask = ~(bothNull | oneNull)
+        if isEquals:
+            data = numpy.where(bothNull, True, numpy.where(oneNull, False, same))
+        else:
+            data = numpy.where(bothNull, False, numpy.where(oneNull, True, ~same))
+        return _ColumnValue('boolean', data, mask)
+
+    def ltrange(self, node):
+        return _ColumnRange('(', None, self.value(node.children[1]), ']' if node.children[0].type == 'LTTHANEQUAL' else ')')
+
+    def gtrange(self, node):
+        return _ColumnRange('[' if node.children[0].type == 'GTTHANEQUAL' else '(', self.value(node.children[1]), None, ')')
+
+    def range(self, node):
+        end1 = ']' if node.children[4].type == 'RBRACKET' else ')'
+        return _ColumnRange('(', self.value(node.children[1]), self.value(node.children[3]), end1)
+
+    def listStartRange(self, node):
+        listStart = node.children[0]
+        if (len(listStart.children) != 2) or isinstance(listStart.children[0], _ExprNode):
+            raise _NotVectorized(listStart.production)
+        end1 = ']' if node.children[3].type == 'RBRACKET' else ')'
+        return _ColumnRange('[', self.value(listStart.children[1]), self.value(node.children[2]), end1)
+
+    def compare(self, node):
+        # Booleans are never less than or greater than anything, nor is null compared to null,
+        # but different data types (including null and a number) are null
+        x0 = self.value(node.children[0])
+        thisRange = self.evaluate(node.children[1])
+        if thisRange.lowVal is None:
+            x1 = thisRange.highVal
+            if thisRange.end1 == ')':
+                data = x0.data < x1.data
+            else:
+                data = x0.data <= x1.data
+        else:
+            x1 = thisRange.lowVal
+            if thisRange.end0 == '(':
+                data = x0.data > x1.data
+            else:
+                data = x0.data >= x1.data
+        isFalse = x0.isBoolean() | x1.isBoolean() | (x0.mask & x1.mask)
+        mask = ~isFalse & (x0.mask | x1.mask | (x0.kind != x1.kind))
+        return _ColumnValue('boolean', data & ~isFalse, mask)
+
+    def inRange(self, node):
+        x = self.value(node.children[0])
+        thisRange = self.evaluate(node.children[2])
+        if isinstance(thisRange, _ColumnValue):         # 'in' as an alternative to '='
+            x1 = thisRange
+            bothNull = x.mask & x1.mask
+            if x.kind == x1.kind:
+                data = bothNull | (~x.mask & ~x1.mask & (x.data == x1.data))
+                mask = x.mask ^ x1.mask
+            else:
+                data = bothNull
+                mask = ~bothNull
+            return _ColumnValue('boolean', data, mask)
+        # A number is in a range with number end points - anything else is not in the range
+        lowVal = thisRange.lowVal
+        highVal = thisRange.highVal
+        lowNull = numpy.True_ if lowVal is None else lowVal.mask
+        highNull = numpy.True_ if highVal is None else highVal.mask
+        lowNumber = numpy.False_ if lowVal is None else lowVal.isNumber()
+        highNumber = numpy.False_ if highVal is None else highVal.isNumber()
+        data = x.isNumber() & ~(lowNull & highNull)
+        data = data & (lowNull | lowNumber) & (highNull | highNumber)
+        if lowVal is not None:
+            data = data & (lowNull | (lowVal.data < x.data) | ((thisRange.end0 == '[') & (lowVal.data == x.data)))
+        if highVal is not None:
+            data = data & (highNull | (highVal.data > x.data) | ((thisRange.end1 == ']') & (highVal.data == x.data)))
+        return _ColumnValue('boolean', data, numpy.False_)
+
+    def between(self, node):
+        betweenExpr = node.children[0]
+        x0 = self.value(betweenExpr.children[0])
+        x1 = self.value(betweenExpr.children[2])
+        x2 = self.value(node.children[1].children[1])
+        for x in (x0, x1, x2):
+            if x.kind not in ('number', 'null'):
+                raise _NotVectorized(node.production)
+        lowNull = x0.mask | x1.mask
+        aboveLow = x0.data >= x1.data
+        data = aboveLow & (x0.data <= x2.data)
+        mask = lowNull | (aboveLow & x2.mask)
+        return _ColumnValue('boolean', data, mask)
+
+    def andOr(self, node):
+        x0 = self.value(node.children[0])
+        isOr = (len(node.children) == 3)         # expr OR expr, otherwise expr andExpr
+        if isOr:
+            x1 = self.value(node.children[2])
+        else:
+            x1 = self.value(node.children[1].children[1])
+        if isOr:
+            data = x0.isTrue() | x1.isTrue()
+            mask = ~(data | (x0.isFalse() & x1.isFalse()))
+        else:
+            data = x0.isTrue() & x1.isTrue()
+            mask = ~(data | x0.isFalse() | x1.isFalse())
+        return _ColumnValue('boolean', data, mask)
+
+    def notFunc(self, node):
+        x = self.value(node.children[1])
+        if x.kind != 'boolean':
+            return _ColumnValue.fromValue(None)
+        return _ColumnValue('boolean', ~x.data, x.mask)
+
+    def mathFunc(self, node):
+        x = self.value(node.children[1])
+        if x.kind != 'number':
+            return _ColumnValue.fromValue(None)
+        data = getattr(numpy, self.mathFuncs[node.children[0].type])(x.data)
+        return _ColumnValue('number', data, x.mask | ~numpy.isfinite(data))
+
+    def modulo(self, node):
+        x0 = self.value(node.children[1])
+        x1 = self.value(node.children[3])
+        if (x0.kind != 'number') or (x1.kind != 'number'):
+            return _ColumnValue.fromValue(None)
+        mask = x0.mask | x1.mask | (x1.data == 0)
+        data = numpy.mod(x0.data, numpy.where(x1.data == 0, 1.0, x1.data))
+        return _ColumnValue('number', data, mask | numpy.isnan(data))
+
 
 if __name__ == '__main__':
     parser = SFeelParser()
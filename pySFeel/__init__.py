@@ -1 +1 @@
-from .SFeel import SFeelLexer, SFeelParser
+from .SFeel import SFeelLexer, SFeelParser, CompiledExpression, EvaluationSession, Range, RangeIndex
@@ -0,0 +1,243 @@
+# -----------------------------------------------------------------------------
+# __main__.py
+# -----------------------------------------------------------------------------
+
+'''
+Evaluate S-FEEL expressions against a stream of records - python -m pySFeel
+
+    python -m pySFeel -e adult 'age >= 18' -e band 'floor(age / 10)' people.jsonl > scored.jsonl
+    python -m pySFeel -e adult 'age >= 18' --workers 4 --chunkSize 5000 people.csv -o scored.csv
+
+Records are read one at a time from JSON Lines (one JSON object per line) or CSV (with a header line) and
+their fields are converted to S-FEEL values - CSV fields that are empty, true, false or numbers become null, booleans and numbers,
+and (in both formats) strings that are strict ISO 8601 dates, times, date and times or durations become dates, times, date and times and durations.
+Each record is written out, in the same format, with the value of each expression added as a field (named by the expression),
+and an 'errors' field if any expression had errors. Only the records that are being evaluated are held in memory.
+'''
+
+import sys
+import argparse
+import csv
+import json
+import re
+import itertools
+from .SFeel import SFeelParser, SFeelLexer, Range, PARALLEL_CHUNK_SIZE, _evaluateParallel, _isoDate, _isoTime, _isoDateTime
+
+
+NUMBER = re.compile(r'-?(([0-9]+(\.[0-9]*)?)|(\.[0-9]+))([eE][-+]?[0-9]+)?')
+DURATION = re.compile(SFeelLexer.DTDURATION + '|' + SFeelLexer.YMDURATION)
+
+
+class RecordConverter:
+    '''
+    Convert record fields to S-FEEL values, and S-FEEL values back to field values
+    '''
+
+    def __init__(self, parser):
+        self.duration = parser.compile('duration(value)')
+        self.string = parser.compile('string(value)')
+
+    def fromString(self, text):
+        ''' Convert a string to a date, time, date and time or duration, if it is one in ISO 8601 format '''
+        if DURATION.fullmatch(text):
+            (status, value) = self.duration.evaluate({'value': text})
+            if 'errors' not in status and (value is not None):
+                return value
+        for convert in (_isoDate, _isoDateTime, _isoTime):
+            value = convert(text)
+            if value is not None:
+                return value
+        return text
+
+    def fromCSV(self, text):
+        ''' Convert a CSV field to an S-FEEL value - a missing field (None) or an empty field is null '''
+        if (text is None) or (text == ''):
+            return None
+        if text in ('true', 'false'):
+            return text == 'true'
+        if NUMBER.fullmatch(text):
+            return float(text)
+        return self.fromString(text)
+
+    def fromJSON(self, value):
+        ''' Convert a JSON value to an S-FEEL value '''
+        if isinstance(value, bool) or (value is None):
+            return value
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            return self.fromString(value)
+        if isinstance(value, list):
+            return [self.fromJSON(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.fromJSON(item) for (key, item) in value.items()}
+        return value
+
+    def toJSON(self, value):
+        ''' Convert an S-FEEL value to a JSON value '''
+        if isinstance(value, (bool, float, str)) or (value is None):
+            return value
+        if isinstance(value, list):
+            return [self.toJSON(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.toJSON(item) for (key, item) in value.items()}
+        if isinstance(value, tuple) and (len(value) == 4):
+            (end0, low, high, end1) = Range.fromValue(value)
+            if low is None:
+                return ('<=' if end1 == ']' else '<') + ' ' + self.toText(high)
+            if high is None:
+                return ('>=' if end0 == '[' else '>') + ' ' + self.toText(low)
+            return f'{end0}{self.toText(low)}..{self.toText(high)}{end1}'
+        (status, text) = self.string.evaluate({'value': value})
+        if text is None:
+            return str(value)
+        return text
+
+    def toText(self, value):
+        ''' Convert an S-FEEL value to text (a CSV field, or a range endpoint) '''
+        value = self.toJSON(value)
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float):
+            return str(int(value)) if value.is_integer() else str(value)
+        if isinstance(value, str):
+            return value
+        return json.dumps(value)
+
+
+def readJSONL(inFile, converter):
+    '''
+    Yield (record, names) for each JSON Lines record
+    A line that isn't a JSON object yields ({'errors': {'record': [error]}}, None), so that it is written out (and not evaluated)
+    '''
+    for (lineNo, line) in enumerate(inFile, start=1):
+        line = line.strip()
+        if line == '':
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ({'errors': {'record': [f'Line {lineNo}: invalid JSON - {e}']}}, None)
+            continue
+        if not isinstance(record, dict):
+            yield ({'errors': {'record': [f'Line {lineNo}: not a JSON object']}}, None)
+            continue
+        yield (record, {name: converter.fromJSON(value) for (name, value) in record.items()})
+
+
+def readCSV(inFile, converter, fieldNames):
+    '''
+    Yield (record, names) for each CSV record
+    Missing fields (a record shorter than the header) are null. A record with more fields than the header yields (record, None),
+    with the extra fields dropped and an 'errors' field, so that it is written out (and not evaluated)
+    '''
+    reader = csv.DictReader(inFile, fieldnames=fieldNames)
+    for record in reader:
+        extra = record.pop(None, None)          # DictReader puts the fields that have no name in a list, under None
+        if extra is not None:
+            # reader.line_num doesn't count the header line, which was read before the reader was created
+            record['errors'] = csvErrors({'record': [f'Line {reader.line_num + 1}: {len(extra)} more field(s) than the header']})
+            yield (record, None)
+            continue
+        yield (record, {name: converter.fromCSV(value) for (name, value) in record.items()})
+
+
+def evaluateRecords(compiled, records, workers, chunkSize):
+    '''
+    Evaluate the compiled expressions against (record, names) pairs, yielding (record, results)
+    Records without names are not evaluated - their results are None.
+    The records are held (by tee()) only until their names have been evaluated
+    '''
+    (forNames, forRecords) = itertools.tee(records)
+    names = (thisNames for (record, thisNames) in forNames if thisNames is not None)
+    results = _evaluateParallel(compiled, names, workers, chunkSize)
+    for (record, thisNames) in forRecords:
+        if thisNames is None:
+            yield (record, None)
+        else:
+            yield (record, next(results))
+
+
+def recordErrors(expressions, results):
+    ''' The errors of each expression that had errors '''
+    errors = {}
+    for ((name, text), (status, value)) in zip(expressions, results):
+        if 'errors' in status:
+            errors[name] = status['errors']
+    return errors
+
+
+def csvErrors(errors):
+    ''' The errors of each expression (see recordErrors()), as the text of a CSV field '''
+    return '; '.join(f'{name}: {error}' for (name, nameErrors) in errors.items() for error in nameErrors)
+
+
+def main(args=None):
+    argParser = argparse.ArgumentParser(prog='python -m pySFeel', description='Evaluate S-FEEL expressions against JSON Lines or CSV records')
+    argParser.add_argument('-e', '--expression', dest='expressions', nargs=2, metavar=('NAME', 'SFEEL'), action='append', required=True,
+                           help='an S-FEEL expression, and the name of the field for its value (repeatable)')
+    argParser.add_argument('-f', '--format', choices=['jsonl', 'csv'], help='the format of the records (default: from the input file name, otherwise jsonl)')
+    argParser.add_argument('-o', '--output', default='-', help='the output file (default: standard output)')
+    argParser.add_argument('-w', '--workers', type=int, default=1, help='the number of worker processes (default: 1 - evaluate in this process, 0 - one per CPU)')
+    argParser.add_argument('-c', '--chunkSize', type=int, default=PARALLEL_CHUNK_SIZE, help='the number of records sent to a worker process at a time')
+    argParser.add_argument('input', nargs='?', default='-', help='the input file (default: standard input)')
+    args = argParser.parse_args(args)
+
+    recordFormat = args.format
+    if recordFormat is None:
+        recordFormat = 'csv' if args.input.lower().endswith('.csv') else 'jsonl'
+    workers = None if args.workers == 0 else args.workers
+
+    parser = SFeelParser()
+    compiled = []
+    for (name, text) in args.expressions:
+        compiled.append(parser.compile(text))
+        if len(compiled[-1].errors) > 0:
+            argParser.error(f'S-FEEL expression {name!r} has errors: {compiled[-1].errors}')
+    converter = RecordConverter(parser)
+
+    inFile = sys.stdin if args.input == '-' else open(args.input, 'rt', newline='', encoding='utf-8')
+    outFile = sys.stdout if args.output == '-' else open(args.output, 'wt', newline='', encoding='utf-8')
+    try:
+        if recordFormat == 'jsonl':
+            records = readJSONL(inFile, converter)
+            for (record, results) in evaluateRecords(compiled, records, workers, args.chunkSize):
+                if results is None:
+                    outFile.write(json.dumps(record) + '\n')
+                    continue
+                for ((name, text), (status, value)) in zip(args.expressions, results):
+                    record[name] = converter.toJSON(value)
+                errors = recordErrors(args.expressions, results)
+                if errors:
+                    record['errors'] = errors
+                outFile.write(json.dumps(record) + '\n')
+        else:
+            reader = csv.reader(inFile)
+            fieldNames = next(reader, None)
+            if fieldNames is None:
+                return 0
+            outNames = fieldNames + [name for (name, text) in args.expressions if name not in fieldNames]
+            outNames += [] if 'errors' in outNames else ['errors']
+            writer = csv.DictWriter(outFile, fieldnames=outNames)
+            writer.writeheader()
+            records = readCSV(inFile, converter, fieldNames)
+            for (record, results) in evaluateRecords(compiled, records, workers, args.chunkSize):
+                if results is None:
+                    writer.writerow(record)
+                    continue
+                for ((name, text), (status, value)) in zip(args.expressions, results):
+                    record[name] = converter.toText(value)
+                record['errors'] = csvErrors(recordErrors(args.expressions, results))
+                writer.writerow(record)
+    finally:
+        if inFile is not sys.stdin:
+            inFile.close()
+        if outFile is not sys.stdout:
+            outFile.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
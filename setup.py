@@ -13,6 +13,7 @@ setuptools.setup(
     long_description_content_type='text/markdown',
     url='https://github.com/russellmcdonell/pySFeel',
     packages=setuptools.find_packages(),
+    package_data={'pySFeel': ['SFeel_parsetab.json']},
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: GNU General Public License v3 (GPLv3)',
@@ -20,5 +21,6 @@ setuptools.setup(
     ],
     python_requires='>=3.6',
     install_requires=['sly','datetime', 'python-dateutil', 'statistics'],
+    extras_require={'numpy': ['numpy']},
 )
 
@@ -1,7 +1,12 @@
 from sly.yacc import ERROR_COUNT
+import pytest
+import pickle
+import json
+import concurrent.futures
 import datetime
 import dateutil
 import pySFeel
+import pySFeel.__main__
 
 parser = pySFeel.SFeelParser()
 
@@ -2903,3 +2908,751 @@ class TestClass:
         
 
 
+    def test_compile1(self):
+        SFeel = 'age >= 18'
+        compiled = parser.compile(SFeel)
+        (status, retval) = compiled.evaluate({'age': 21.0})
+        assert 'errors' not in status
+        assert retval == True
+        (status, retval) = compiled.evaluate({'age': 12.0})
+        assert 'errors' not in status
+        assert retval == False
+
+    def test_compile2(self):
+        SFeel = 'total <- sum(prices) * (1 + rate)'
+        compiled = parser.compile(SFeel)
+        names = {'prices': [10.0, 20.0], 'rate': 0.5}
+        (status, retval) = compiled.evaluate(names)
+        assert 'errors' not in status
+        assert retval == 45.0
+        assert names['total'] == 45.0
+        assert 'total' not in parser.names
+
+    def test_compile3(self):
+        SFeel = '{a:x, b:a+1}.b'
+        compiled = parser.compile(SFeel)
+        for x in [1.0, 2.0, 3.0]:
+            (status, retval) = compiled.evaluate({'x': x})
+            assert 'errors' not in status
+            assert retval == x + 1
+
+    def test_compile4(self):
+        SFeel = '7 + * 3'
+        compiled = parser.compile(SFeel)
+        assert len(compiled.errors) > 0
+        (status, retval) = compiled.evaluate()
+        assert 'errors' in status
+        SFeel = 'unknown + 1'
+        compiled = parser.compile(SFeel)
+        assert compiled.errors == []
+        (status, retval) = compiled.evaluate({})
+        assert status['errors'] == ["Undefined name 'unknown'"]
+        (status, retval) = compiled.evaluate({'unknown': 1.0})
+        assert 'errors' not in status
+        assert retval == 2.0
+
+    def test_cache1(self):
+        cachedParser = pySFeel.SFeelParser(cacheSize=2)
+        for age in [10.0, 20.0, 30.0]:
+            cachedParser.names['age'] = age
+            (status, retval) = cachedParser.sFeelParse('age < 18')
+            assert 'errors' not in status
+            assert retval == (age < 18)
+        assert cachedParser.cacheInfo() == {'hits': 2, 'misses': 1, 'evictions': 0, 'size': 1, 'maxSize': 2}
+        (status, retval) = cachedParser.sFeelParse('[1..10]')
+        (status, retval) = cachedParser.sFeelParse('-')
+        (status, retval) = cachedParser.sFeelParse('age < 18')
+        assert cachedParser.cacheInfo() == {'hits': 2, 'misses': 4, 'evictions': 2, 'size': 2, 'maxSize': 2}
+        cachedParser.clearCache()
+        assert cachedParser.cacheInfo()['size'] == 0
+
+    def test_cache2(self):
+        cachedParser = pySFeel.SFeelParser(cacheSize=10)
+        (status, retval) = cachedParser.sFeelParse('fred <- 7')
+        assert 'errors' not in status
+        (status, retval) = cachedParser.sFeelParse('fred + 1')
+        assert retval == 8.0
+        (status, retval) = cachedParser.sFeelParse('fred <- 7 +')
+        assert 'errors' in status
+        (status, retval) = cachedParser.sFeelParse('fred <- 7 +')
+        assert 'errors' in status
+
+    def test_parsetab1(self):
+        grammar = pySFeel.SFeelParser._grammar
+        signature = pySFeel.SFeel._parseTablesSignature(grammar)
+        lrtable = pySFeel.SFeel._loadParseTables(grammar, signature)
+        assert lrtable is not None
+        assert lrtable.lr_action == pySFeel.SFeelParser._lrtable.lr_action
+        assert lrtable.lr_goto == pySFeel.SFeelParser._lrtable.lr_goto
+
+    def test_shortcircuit1(self):
+        SFeel = 'false and fred'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' not in status
+        assert retval == False
+        SFeel = 'null and false'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' not in status
+        assert retval == False
+        SFeel = 'true and null'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' not in status
+        assert retval is None
+
+    def test_shortcircuit2(self):
+        SFeel = 'true or fred'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'false or fred'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' in status
+        assert retval is None
+        SFeel = 'null or true'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' not in status
+        assert retval == True
+
+    def test_some1(self):
+        SFeel = 'some x in [1,2,3] satisfies x > 2'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'some x in [1,2,3] satisfies (x > 1) and odd(x)'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'some x in [{a:1,b:2},{a:5,b:6}] satisfies x.a + x.b = 3'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'some x in [] satisfies x > 2'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == False
+
+    def test_every1(self):
+        SFeel = 'every x in [1,2,3] satisfies x > 2'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == False
+        SFeel = 'every x in [1,2,3] satisfies (x > 0) and (x < 4)'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'every x in [date("2020-01-01"), date("2020-12-31")] satisfies x.year = 2020'
+        (status, retval) = parser.compile(SFeel).evaluate()
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'every x in 7 satisfies x > 2'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval is None
+
+    def test_evaluateMany1(self):
+        SFeel = 'age >= 18'
+        results = list(parser.evaluateMany(SFeel, [{'age':21.0}, {'age':12.0}, {}]))
+        assert len(results) == 3
+        (status, retval) = results[0]
+        assert 'errors' not in status
+        assert retval == True
+        (status, retval) = results[1]
+        assert 'errors' not in status
+        assert retval == False
+        (status, retval) = results[2]
+        assert 'errors' in status
+
+    def test_evaluateMany2(self):
+        compiled = parser.compile('x * 2 + 1')
+        results = [retval for (status, retval) in compiled.evaluateMany({'x':float(i)} for i in range(4))]
+        assert results == [1.0, 3.0, 5.0, 7.0]
+
+    def test_columns1(self):
+        numpy = pytest.importorskip('numpy')
+        x = numpy.ma.MaskedArray([1.0, 2.0, 3.0, 4.0], mask=[False, False, True, False])
+        y = numpy.array([2.0, 0.0, 1.0, 3.0])
+        (status, values) = parser.evaluateColumns('x / y + 1', {'x':x, 'y':y})
+        assert 'errors' not in status
+        assert list(values.mask) == [False, True, True, False]
+        assert values[0] == 1.5
+        assert values[3] == 4.0 / 3.0 + 1.0
+        (status, values) = parser.evaluateColumns('x in [2..4)', {'x':x})
+        assert 'errors' not in status
+        assert list(values) == [False, True, False, False]
+
+    def test_columns2(self):
+        numpy = pytest.importorskip('numpy')
+        x = numpy.ma.MaskedArray([1.0, 5.0, 7.0], mask=[False, False, True])
+        b = numpy.ma.MaskedArray([True, False, True], mask=[False, False, True])
+        (status, values) = parser.evaluateColumns('(x > 2) and b', {'x':x, 'b':b})
+        assert 'errors' not in status
+        assert values[0] == False
+        assert values[1] == False
+        assert values.mask[2]
+        (status, values) = parser.evaluateColumns('(x > 2) or b', {'x':x, 'b':b})
+        assert 'errors' not in status
+        assert values[0] == True
+        assert values[1] == True
+        assert values.mask[2]
+        (status, values) = parser.evaluateColumns('x = null', {'x':x})
+        assert 'errors' not in status
+        assert list(values) == [False, False, True]
+
+    def test_columns3(self):
+        numpy = pytest.importorskip('numpy')
+        names = numpy.array(['fred', 'bill'])
+        (status, values) = parser.evaluateColumns('upper case(name) = "FRED"', {'name':names})
+        assert 'errors' not in status
+        assert list(values) == [True, False]
+        (status, values) = parser.evaluateColumns('modulo(x, 3) + abs(-2)', {'x':numpy.array([7, 8])})
+        assert 'errors' not in status
+        assert list(values) == [3.0, 4.0]
+
+    def test_columns4(self):
+        numpy = pytest.importorskip('numpy')
+        x = numpy.ma.MaskedArray([-1.5, 4.0, -2.0], mask=[False, False, True])
+        (status, values) = parser.evaluateColumns('x ** 0.5', {'x':x})
+        assert 'errors' not in status
+        assert values[0] == parser.compile('x ** 0.5').evaluate({'x':-1.5})[1]
+        assert values[1] == 2.0
+        assert values.mask[2]
+        (status, values) = parser.evaluateColumns('x ** 2', {'x':x})
+        assert 'errors' not in status
+        assert list(values.mask) == [False, False, True]
+        assert values[0] == 2.25
+
+    def test_evaluationContext1(self):
+        context = parser.evaluationContext({'x': 2.0})
+        assert context.lexer is None
+        assert parser.compile('x * 3').function(context) == 6.0
+        assert context.lexer is None
+        (lexErrors, tokens) = context.sFeelTokens('x * 3')
+        assert lexErrors == []
+        assert [token.type for token in tokens] == ['NAME', 'MULTIPY', 'NUMBER']
+        assert context.lexer is not None
+
+    def test_quantifiedNames1(self):
+        names = {'x': 10.0, 'd': 5.0}
+        for (SFeel, expected) in [('some x in [1, 2, 3] satisfies x > 5', False), ('every x in [1, 2, 3] satisfies x > 5', False),
+                                  ('some x in [1, 2, 3] satisfies x > 2', True), ('some d in [@"2020-01-01"] satisfies d.year = 2020', True),
+                                  ('every x in [1, 2, 3] satisfies {a: x}.a < 4', True), ('{y: x + 1}.y', 11.0)]:
+            compiled = parser.compile(SFeel)
+            (status, retval) = compiled.evaluate(dict(names))
+            assert 'errors' not in status
+            assert retval == expected
+            assert compiled.tree.evaluate(parser.evaluationContext(dict(names))) == expected
+
+    def test_threads1(self):
+        compiled = parser.compile('(x * 2 + y) > 100')
+        def evaluate(i):
+            x = float(i % 97)
+            y = float(i % 13)
+            (status, retval) = compiled.evaluate({'x':x, 'y':y})
+            assert 'errors' not in status
+            assert retval == ((x * 2 + y) > 100)
+            SFeel = f'{x} * 2 + {y}'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == x * 2 + y
+            return True
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            assert all(executor.map(evaluate, range(2000)))
+
+    def test_literals1(self):
+        SFeel = '[' + ', '.join(str(i) for i in range(5000)) + ']'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == [float(i) for i in range(5000)]
+        SFeel = '{' + ', '.join(f'code{i}: {i}' for i in range(5000)) + '}'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert len(retval) == 5000
+        assert retval['code4999'] == 4999.0
+
+    def test_literals2(self):
+        compiled = parser.compile('[1, [2, 3], [], 4]')
+        (status, retval) = compiled.evaluate()
+        assert 'errors' not in status
+        assert retval == [1.0, [2.0, 3.0], 4.0]
+        (status, retval) = compiled.evaluate()
+        assert retval == [1.0, [2.0, 3.0], 4.0]
+        compiled = parser.compile('{a: 1, b: 2, c: 3}')
+        (status, retval) = compiled.evaluate()
+        assert retval == {'a': 1.0, 'b': 2.0, 'c': 3.0}
+        (status, retval) = compiled.evaluate()
+        assert retval == {'a': 1.0, 'b': 2.0, 'c': 3.0}
+
+    def test_isodates1(self):
+        SFeel = 'date("2021-02-28") + @"P1D"'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == datetime.date(2021, 3, 1)
+        SFeel = 'date("2021-02-29")'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert retval is None
+        SFeel = 'time("10:11:12.5+05:30")'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == datetime.time(10, 11, 12, 500000, tzinfo=dateutil.tz.tzoffset(None, 19800))
+        SFeel = 'date and time("2021-06-30T23:59:59-03:00").hour'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == 23.0
+
+    def test_isodates2(self):
+        # Not strict ISO 8601, so converted by dateutil
+        SFeel = 'date("2021-6-3")'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == datetime.date(2021, 6, 3)
+        SFeel = 'date and time("2021-06-03T10:11:12Z") = date and time("2021-06-03T10:11:12+00:00")'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+
+    def test_nameProperties1(self):
+        SFeel = 'thisRange <- [1..5)'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        SFeel = 'thisRange.start_included'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+        SFeel = 'thisRange.end_included'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == False
+        SFeel = '{r: [2..6], s: r.end, t: r.start_included}'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval['s'] == 6.0
+        assert retval['t'] == True
+
+    def test_nameProperties2(self):
+        SFeel = 'thisDuration <- @"P3DT5H"'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        SFeel = 'thisDuration.hours'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == 5.0
+        SFeel = 'thisDuration.year'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' in status
+        SFeel = 'thisDuration.colour'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' in status
+
+    def test_scopes1(self):
+        SFeel = '{a: 1, b: {a: 2, c: a + 1}, d: a}'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == {'a': 1.0, 'b': {'a': 2.0, 'c': 3.0}, 'd': 1.0}
+        SFeel = '{x: 10, y: some x in [1, 2, 3] satisfies x > 2, z: x}'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == {'x': 10.0, 'y': True, 'z': 10.0}
+        SFeel = '{a: 1, a: 2}'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' in status
+
+    def test_regexCache1(self):
+        before = parser.regexCacheInfo()
+        for i in range(3):
+            SFeel = 'replace("abcd", "(ab)|(a)", "[1=$1][2=$2]")'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == '[1=ab][2=]cd'
+            SFeel = 'split(["a1b22c"], "[0-9]+")'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == ['a', 'b', 'c']
+        after = parser.regexCacheInfo()
+        assert after['hits'] >= before['hits'] + 4
+        assert after['size'] <= after['maxSize']
+
+    def test_distinct1(self):
+        SFeel = 'distinct values([1, 2, 1, [1, 2], [1, 2], {a: 1}, {a: 1}, [1..2], [1..2], null, null])'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == [1.0, 2.0, [1.0, 2.0], {'a': 1.0}, ('[', 1.0, 2.0, ']'), None]
+        SFeel = 'union([{a: [1]}, 2], [2, 3], [{a: [1]}, 4])'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == [{'a': [1.0]}, 2.0, 3.0, 4.0]
+
+    def test_distinct2(self):
+        # Large lists, and items that can't be hashed
+        SFeel = 'union(theseIds, thoseIds)'
+        rows = [{'theseIds': [float(i % 5000) for i in range(50000)], 'thoseIds': [float(i) for i in range(2500, 7500)]}]
+        (status, retval) = next(parser.evaluateMany(SFeel, rows))
+        assert 'errors' not in status
+        assert retval == [float(i) for i in range(7500)]
+        SFeel = 'distinct values(theseItems)'
+        (status, retval) = next(parser.evaluateMany(SFeel, [{'theseItems': [{1, 2}, 1.0, {1, 2}, 1.0]}]))
+        assert 'errors' not in status
+        assert retval == [{1, 2}, 1.0]
+
+    def test_listIndex1(self):
+        SFeel = 'theseIds <- [' + ', '.join(str(i % 100) for i in range(200)) + ']'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        for i in range(3):
+            SFeel = 'list contains(theseIds, 42)'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == True
+            SFeel = 'index of(theseIds, 42)'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == [43, 143]
+            SFeel = 'list contains(list: theseIds, element: 100)'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == False
+        # Reassigning the list discards its index
+        SFeel = 'theseIds <- [' + ', '.join(str(i + 100) for i in range(200)) + ']'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        for i in range(2):
+            SFeel = 'index of(theseIds, 142)'
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            assert retval == [43]
+
+    def test_listIndex2(self):
+        thisParser = pySFeel.SFeelParser()
+        ids = [float(i) for i in range(100)]
+        compiled = thisParser.compile('[list contains(ids, 999), index of(ids, 999), list contains(ids, 5)]')
+        for i in range(3):
+            (status, retval) = compiled.evaluate({'ids': ids})
+            assert retval == [False, [], True]
+        # A list that is changed in place, without changing its length, has to be forgotten
+        ids[5] = 999.0
+        thisParser.forgetListIndex(ids)
+        for i in range(2):
+            (status, retval) = compiled.evaluate({'ids': ids})
+            assert 'errors' not in status
+            assert retval == [True, [6], False]
+        # Changing its length discards the index
+        del ids[0]
+        (status, retval) = compiled.evaluate({'ids': ids})
+        assert retval == [True, [5], False]
+        contexts = [{'x': float(i)} for i in range(100)]
+        for i in range(2):
+            (status, retval) = compiled.evaluate({'ids': contexts})
+            assert retval == [False, [], False]
+        # EvaluationSession.changed() forgets the index of a list changed in place
+        session = pySFeel.EvaluationSession(thisParser, {'ids': ids})
+        session.add('index of(ids, 999)', 'found')
+        for i in range(3):
+            session.changed('ids')
+            assert session.result('found') == ({}, [5])
+        ids[0] = 999.0
+        session.changed('ids')
+        assert session.result('found') == ({}, [1, 5])
+
+    def test_rangeType1(self):
+        SFeel = '[1..5)'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert isinstance(retval, pySFeel.Range)
+        assert retval == ('[', 1.0, 5.0, ')')
+        assert retval.contains(1.0)
+        assert not retval.contains(5.0)
+        assert not retval.contains('1')
+        assert pickle.loads(pickle.dumps(retval)) == retval
+        assert pySFeel.Range('(', None, 'c', ']').contains('b')
+
+    def test_rangeType2(self):
+        SFeel = 'date and time("2020-01-01T10:00:00") in [date("2019-01-01")..date("2021-01-01")]'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == False
+        SFeel = 'true in [[1..2], true]'
+        (status, retval) = parser.sFeelParse(SFeel)
+        assert 'errors' not in status
+        assert retval == True
+
+    def test_rangeType3(self):
+        thisRange = pySFeel.Range('(', 'a', 5.0, ']')
+        assert thisRange.kind is None
+        assert not thisRange.contains('b')
+        assert not thisRange.contains(3.0)
+        thisRange = pickle.loads(pickle.dumps(pySFeel.Range('(', None, 5.0, ']')))
+        assert thisRange.kind is float
+        assert thisRange.contains(5.0)
+        assert not thisRange.contains(5.5)
+        assert not thisRange.contains('5')
+        assert pySFeel.Range.fromValue(('[', datetime.date(2020, 1, 1), None, ')')).contains(datetime.date(2021, 1, 1))
+
+    def test_rangeIndex1(self):
+        tests = ['[0..17]', '[18..64]', '(>= 65)', '(< 18)', '(0..18]', '"adult"']
+        ranges = []
+        for SFeel in tests:
+            (status, retval) = parser.sFeelParse(SFeel)
+            assert 'errors' not in status
+            ranges.append(retval)
+        index = pySFeel.RangeIndex(ranges)
+        assert index.matches(40.0) == [1]
+        assert index.matches(18.0) == [1, 4]
+        assert index.matches(17.5) == [3, 4]
+        assert index.matches(0.0) == [0, 3]
+        assert index.matches(65.0) == [2]
+        assert index.matches('adult') == [5]
+        assert index.matches(datetime.date(2020, 1, 1)) == []
+        assert index.matches(None) == []
+
+    def test_rangeIndex2(self):
+        ranges = [pySFeel.Range('[', float(i * 10), float(i * 10 + 10), ')') for i in range(100)]
+        ranges.append(('(', None, 15.0, ']'))
+        ranges.append(('[', 1.0, 'z', ']'))
+        index = pySFeel.RangeIndex(ranges)
+        assert index.matches(15.0) == [1, 100]
+        assert index.matches(20.0) == [2]
+        assert index.matches(1000.0) == []
+
+    def test_rangeIndex3(self):
+        index = pySFeel.RangeIndex([('[', 10.0, 1.0, ']')])
+        assert index.matches(5.0) == []
+        ranges = [('[', 10.0, 1.0, ']'), ('(', 5.0, 5.0, ']'), ('[', 5.0, 5.0, ')'), ('[', 5.0, 5.0, ']'), ('[', 'b', 'a', ']'), ('[', 1.0, 9.0, ']')]
+        index = pySFeel.RangeIndex(ranges)
+        for value in (0.0, 1.0, 5.0, 7.0, 10.0, 'a'):
+            assert index.matches(value) == [position for (position, thisRange) in enumerate(ranges) if pySFeel.Range(*thisRange).contains(value)]
+        assert index.matches(5.0) == [3, 5]
+
+    def test_inLiterals1(self):
+        compiled = parser.compile('x in ["a", "b", 1, null, date("2020-01-01")]')
+        for i in range(2):
+            (status, retval) = compiled.evaluate({'x': 'b'})
+            assert 'errors' not in status
+            assert retval == True
+            (status, retval) = compiled.evaluate({'x': datetime.date(2020, 1, 1)})
+            assert retval == True
+            (status, retval) = compiled.evaluate({'x': 'c'})
+            assert retval == False
+            (status, retval) = compiled.evaluate({'x': [1.0]})
+            assert retval == False
+        compiled = parser.compile('x in (1, 2, 3)')
+        (status, retval) = compiled.evaluate({'x': 2.0})
+        assert 'errors' not in status
+        assert retval == True
+        (status, retval) = compiled.evaluate({'x': 4.0})
+        assert retval == False
+
+    def test_inLiterals2(self):
+        # Long lists, and lists that include ranges
+        compiled = parser.compile('x in [' + ', '.join(f'"id{i}"' for i in range(2000)) + ']')
+        (status, retval) = compiled.evaluate({'x': 'id1999'})
+        assert 'errors' not in status
+        assert retval == True
+        (status, retval) = compiled.evaluate({'x': 'id2000'})
+        assert retval == False
+        compiled = parser.compile('x in [[1..3], 5]')
+        (status, retval) = compiled.evaluate({'x': 2.0})
+        assert 'errors' not in status
+        assert retval == True
+
+    def test_parallel1(self):
+        rows = [{'x': float(i), 'limit': 10.0} for i in range(100)]
+        rows.append({'x': 'a', 'limit': 10.0})
+        rows.append(['not', 'names'])
+        results = list(parser.evaluateParallel('x * 2 > limit', rows, workers=2, chunkSize=7))
+        assert len(results) == 102
+        for i in range(100):
+            (status, retval) = results[i]
+            assert 'errors' not in status
+            assert retval == (i * 2 > 10)
+        (status, retval) = results[101]
+        assert 'errors' in status
+        assert retval is None
+
+    def test_parallel3(self):
+        thisParser = pySFeel.SFeelParser()
+        thisParser.names['limit'] = 10.0
+        rows = [{'x': float(i)} for i in range(10)]
+        results = list(thisParser.evaluateParallel('x * 2', rows, workers=2))
+        assert results == [({}, i * 2.0) for i in range(10)]
+        # Each row is all the names - the parser's names are not used
+        (status, retval) = next(thisParser.compile('x > limit').evaluateParallel([{'x': 20.0}], workers=2))
+        assert status == {'errors': ["Undefined name 'limit'"]}
+
+    def test_parallel2(self):
+        compiled = parser.compile('x in [1, 2, 3]')
+        thisCompiled = pickle.loads(pickle.dumps(compiled))
+        (status, retval) = thisCompiled.evaluate({'x': 2.0})
+        assert 'errors' not in status
+        assert retval == True
+        thisParser = pickle.loads(pickle.dumps(parser))
+        (status, retval) = thisParser.sFeelParse('1 + 2')
+        assert retval == 3.0
+        results = list(compiled.evaluateParallel([{'x': 3.0}, {'x': 4.0}], workers=1))
+        assert results == [({}, True), ({}, False)]
+
+    def test_batch1(self, tmp_path):
+        inFile = tmp_path / 'in.jsonl'
+        outFile = tmp_path / 'out.jsonl'
+        inFile.write_text('{"age": 20, "born": "2000-01-02"}\n\n{"age": 12, "born": "2012-05-06", "wait": "P1D"}\n{"age": "x"}\n')
+        assert pySFeel.__main__.main(['-e', 'adult', 'age >= 18', '-e', 'next', 'born + duration("P1Y")', '-e', 'later', 'born + wait',
+                                      '-c', '2', str(inFile), '-o', str(outFile)]) == 0
+        records = [json.loads(line) for line in outFile.read_text().splitlines()]
+        assert len(records) == 3
+        assert records[0]['adult'] == True
+        assert records[0]['next'] == '2001-01-02'
+        assert 'later' in records[0]['errors']
+        assert records[1] == {'age': 12, 'born': '2012-05-06', 'wait': 'P1D', 'adult': False, 'next': '2013-05-06', 'later': '2012-05-07'}
+        assert 'born' not in records[2]
+        assert records[2]['adult'] is None
+
+    def test_batch2(self, tmp_path):
+        inFile = tmp_path / 'in.csv'
+        outFile = tmp_path / 'out.csv'
+        inFile.write_text('age,born,name\n20,2000-01-02,Fred\n12.5,,Jo\n')
+        assert pySFeel.__main__.main(['-e', 'adult', 'age >= 18', '-e', 'band', '[floor(age)..age]', '-e', 'hello', '"Hi " + name',
+                                      str(inFile), '-o', str(outFile)]) == 0
+        lines = outFile.read_text().splitlines()
+        assert lines == ['age,born,name,adult,band,hello,errors', '20,2000-01-02,Fred,true,[20..20],Hi Fred,', '12.5,,Jo,false,[12..12.5],Hi Jo,']
+
+    def test_batch3(self, tmp_path):
+        inFile = tmp_path / 'in.jsonl'
+        outFile = tmp_path / 'out.jsonl'
+        inFile.write_text('{"age": 20}\n{"age": \n[1, 2]\n{"age": 12}\n')
+        assert pySFeel.__main__.main(['-e', 'adult', 'age >= 18', '-w', '2', '-c', '1', str(inFile), '-o', str(outFile)]) == 0
+        records = [json.loads(line) for line in outFile.read_text().splitlines()]
+        assert len(records) == 4
+        assert records[0] == {'age': 20, 'adult': True}
+        assert records[1]['errors']['record'][0].startswith('Line 2: invalid JSON')
+        assert records[2] == {'errors': {'record': ['Line 3: not a JSON object']}}
+        assert records[3] == {'age': 12, 'adult': False}
+
+    def test_batch4(self, tmp_path):
+        inFile = tmp_path / 'in.csv'
+        outFile = tmp_path / 'out.csv'
+        inFile.write_text('age,name\n20,Fred\n12\n30,Jo,extra,more\n40,Al\n')
+        assert pySFeel.__main__.main(['-e', 'adult', 'age >= 18', '-e', 'known', 'name != null', str(inFile), '-o', str(outFile)]) == 0
+        lines = outFile.read_text().splitlines()
+        assert lines == ['age,name,adult,known,errors', '20,Fred,true,true,', '12,,false,false,',
+                         '30,Jo,,,record: Line 4: 2 more field(s) than the header', '40,Al,true,true,']
+
+    def test_closure1(self):
+        names = {'age': 21.0, 'income': 1000.0, 'x': 2.0, 'y': 3.0, 'when': datetime.date(2020, 1, 31)}
+        for SFeel in ['age >= 18 and income < 50000', 'x * 2 + y - 3 = 7', '-x ** 2 / y', 'not(x = 2) or y != 3', 'x in [1, 2, 3, "a"]',
+                      'x in (< 1, [2..3])', 'x in <= 2', 'some i in [1, 2, 3] satisfies i > x', 'every i in [1, 2, 3] satisfies i > x',
+                      'when + duration("P1M")', '(x between 1 and y) and z', '[1, [2], 3] + [x, y]']:
+            compiled = parser.compile(SFeel)
+            assert compiled.function(parser.evaluationContext(dict(names))) == compiled.tree.evaluate(parser.evaluationContext(dict(names)))
+
+    def test_closure2(self):
+        compiled = parser.compile('count([' + ', '.join(str(i) for i in range(5000)) + ']) + x')
+        (status, retval) = compiled.evaluate({'x': 1.0})
+        assert 'errors' not in status
+        assert retval == 5001.0
+        (status, retval) = compiled.evaluate({})
+        assert status == {'errors': ["Undefined name 'x'"]}
+
+    def test_fold1(self):
+        compiled = parser.compile('date("2024-01-01") + duration("P30D")')
+        assert isinstance(compiled.tree.children[0], pySFeel.SFeel._ConstantNode)
+        (status, retval) = compiled.evaluate()
+        assert 'errors' not in status
+        assert retval == datetime.date(2024, 1, 31)
+        for SFeel in ['now()', 'today() + duration("P1D")', 'x + 1', 'date("March 3")', 'time("10:00:00@Europe/Paris")']:
+            compiled = parser.compile(SFeel)
+            assert not isinstance(compiled.tree.children[0], pySFeel.SFeel._ConstantNode)
+        compiled = parser.compile('x + upper case("abc")')
+        assert isinstance(compiled.tree.children[0].children[2], pySFeel.SFeel._ConstantNode)
+        (status, retval) = compiled.evaluate({'x': 'a'})
+        assert retval == 'aABC'
+
+    def test_fold2(self):
+        compiled = parser.compile('[1, [2, 3], {a: 4}]')
+        (status, retval) = compiled.evaluate()
+        assert retval == [1.0, [2.0, 3.0], {'a': 4.0}]
+        retval[1].append(5.0)
+        retval[2]['b'] = 6.0
+        (status, retval) = compiled.evaluate()
+        assert retval == [1.0, [2.0, 3.0], {'a': 4.0}]
+
+    def test_dependencies1(self):
+        compiled = parser.compile('applicant.age + born.year + {a: 1, b: a + z}.b + (some i in list satisfies i.y > q)')
+        assert compiled.freeNames == frozenset(['applicant.age', 'born.year', 'born', 'z', 'list', 'q'])
+        assert compiled.localNames == frozenset(['a', 'i.y'])
+        assert compiled.assignedNames == frozenset()
+        assert compiled.deterministic == True
+
+    def test_dependencies2(self):
+        compiled = parser.compile('total <- price * (1 + rate) + (today() - start).days')
+        assert compiled.freeNames == frozenset(['price', 'rate', 'start'])
+        assert compiled.assignedNames == frozenset(['total'])
+        assert compiled.deterministic == False
+        compiled = parser.compile('i + (every i in [1, 2] satisfies i > 0)')
+        assert compiled.freeNames == frozenset(['i'])
+        assert compiled.localNames == frozenset(['i'])
+
+    def test_session1(self):
+        session = pySFeel.EvaluationSession(parser, {'price': 10.0, 'rate': 0.5, 'qty': 2.0})
+        session.add('net <- price * (1 + rate)', 'net')
+        session.add('net * qty', 'total')
+        session.add('price > 5', 'dear')
+        assert session.refresh() == ['net', 'total', 'dear']
+        assert session.result('total') == ({}, 30.0)
+        session.set('qty', 3.0)
+        assert session.refresh() == ['total']
+        session.set('qty', 3.0)
+        assert session.refresh() == []
+        session.set('rate', 0.0)
+        assert session.refresh() == ['net', 'total']
+        assert session.results() == {'net': ({}, 10.0), 'total': ({}, 30.0), 'dear': ({}, True)}
+        session.set('price', 10.0)
+        assert session.refresh() == []
+
+    def test_session2(self):
+        session = pySFeel.EvaluationSession(parser, {'x': 1.0})
+        session.add('y * 2', 'early')
+        session.add('y <- x + 1', 'assign')
+        session.add('now()', 'now')
+        (status, retval) = session.result('early')
+        assert 'errors' in status
+        assert session.values['assign'] == ({}, 2.0)
+        assert session.refresh() == ['early', 'now']
+        assert session.values['early'] == ({}, 4.0)
+        session.add('x * 10', 'assign')
+        assert session.refresh() == ['assign', 'now']
+        session.remove('now')
+        assert session.refresh() == []
+        assert list(session.results()) == ['early', 'assign']
+
+    def test_memo1(self):
+        compiled = parser.compile('(plan = "gold") and (age > 18) and (count(extras) > 1)', memoSize=2)
+        names = {'plan': 'gold', 'age': 30.0, 'extras': [1.0, 2.0], 'postcode': '2000'}
+        assert compiled.evaluate(names) == ({}, True)
+        assert compiled.evaluate(dict(names, postcode='3000')) == ({}, True)
+        assert compiled.memoInfo()['hits'] == 1
+        names['extras'].pop()
+        assert compiled.evaluate(names) == ({}, False)
+        assert compiled.evaluate(dict(names, age=12.0)) == ({}, False)
+        info = compiled.memoInfo()
+        assert (info['hits'], info['misses'], info['evictions'], info['size']) == (1, 3, 1, 2)
+        compiled = parser.compile('string(value)', memoSize=10)
+        assert compiled.evaluate({'value': 1.0}) == ({}, '1')
+        assert compiled.evaluate({'value': True}) == ({}, 'true')
+        assert compiled.evaluate({'value': 1.0}) == ({}, '1')
+        assert compiled.memoInfo()['hits'] == 1
+
+    def test_memo2(self):
+        compiled = parser.compile('today()', memoSize=10)
+        assert compiled.pure == False
+        compiled.evaluate()
+        assert compiled.memoInfo()['size'] == 0
+        compiled = parser.compile('x', memoSize=10)
+        x = [1.0, [2.0]]
+        (status, retval) = compiled.evaluate({'x': x})
+        retval[1].append(3.0)
+        x[1].append(4.0)
+        assert compiled.evaluate({'x': [1.0, [2.0]]}) == ({}, [1.0, [2.0]])
+        assert compiled.memoInfo()['hits'] == 1
+        compiled = parser.compile('y', memoSize=10)
+        compiled.evaluate({'y': {1, 2}})
+        assert compiled.memoInfo()['bypassed'] == 1
+        thisCompiled = pickle.loads(pickle.dumps(compiled))
+        assert thisCompiled.memoInfo()['maxSize'] == 10